@@ -31,6 +31,25 @@ resource "aws_iam_role_policy_attachment" "lambda_logs" {
   policy_arn = "arn:aws:iam::aws:policy/service-role/AWSLambdaBasicExecutionRole"
 }
 
+# Allow budgeted scans to upload their items
+resource "aws_iam_role_policy" "result_bucket_write" {
+  count = var.result_bucket != "" ? 1 : 0
+
+  name = "${var.function_name}-result-bucket-write"
+  role = aws_iam_role.lambda_exec.id
+
+  policy = jsonencode({
+    Version = "2012-10-17"
+    Statement = [
+      {
+        Action   = ["s3:PutObject"]
+        Effect   = "Allow"
+        Resource = "arn:aws:s3:::${var.result_bucket}/*"
+      }
+    ]
+  })
+}
+
 # CloudWatch Log Group
 resource "aws_cloudwatch_log_group" "lambda_logs" {
   name              = "/aws/lambda/${var.function_name}"
@@ -57,7 +76,23 @@ resource "aws_lambda_function" "scan_ec2_unattached_ebs" {
   source_code_hash = filebase64sha256(local.artifact_path)
 
   timeout     = 60
-  memory_size = 256
+  memory_size = var.memory_size
+
+  environment {
+    variables = {
+      SAVER_MEMORY_BUDGET_BYTES = tostring(var.memory_budget_bytes)
+      SAVER_RESULT_SINK         = var.result_bucket != "" ? "s3" : "file"
+      SAVER_RESULT_BUCKET       = var.result_bucket
+    }
+  }
+
+  lifecycle {
+    precondition {
+      # Budgeted scans stream items to a sink; a file in the function's /tmp is unreachable
+      condition     = var.memory_budget_bytes == 0 || var.result_bucket != ""
+      error_message = "result_bucket is required when memory_budget_bytes > 0."
+    }
+  }
 
   tags = merge(
     var.tags,
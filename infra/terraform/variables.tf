@@ -16,3 +16,21 @@ variable "tags" {
   default     = {}
 }
 
+
+variable "memory_size" {
+  description = "Lambda memory size in MB"
+  type        = number
+  default     = 256
+}
+
+variable "memory_budget_bytes" {
+  description = "Approximate in-memory result budget before spilling to /tmp (0 disables spilling)"
+  type        = number
+  default     = 0
+}
+
+variable "result_bucket" {
+  description = "Bucket that budgeted scans stream their items to (required when memory_budget_bytes > 0)"
+  type        = string
+  default     = ""
+}
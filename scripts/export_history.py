@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Append saved handler results to the Parquet scan history dataset.
+
+Usage:
+    python scripts/export_history.py --root history/ results/*.json
+    python scripts/export_history.py --root history/ --compact
+    python scripts/export_history.py --root history/ --summary
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from saverbot.history import compact, orphaned_gib_by_day, write_scan_result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export scan results to Parquet history")
+    parser.add_argument("--root", required=True, type=Path, help="History dataset root")
+    parser.add_argument(
+        "files",
+        nargs="*",
+        type=Path,
+        help="Handler result files (one JSON object, or one per line)",
+    )
+    parser.add_argument("--compact", action="store_true", help="Merge small files afterwards")
+    parser.add_argument(
+        "--summary", action="store_true", help="Print orphaned GiB per day and account"
+    )
+    args = parser.parse_args()
+
+    exported = 0
+    for path in args.files:
+        text = path.read_text()
+        try:
+            results = [json.loads(text)]
+        except json.JSONDecodeError:
+            results = [json.loads(line) for line in text.splitlines() if line.strip()]
+
+        for result in results:
+            if "error" in result:
+                print(f"Skipping error result in {path}", file=sys.stderr)
+                continue
+            exported += len(write_scan_result(result, args.root))
+
+    print(f"Wrote {exported} file(s) to {args.root}")
+
+    if args.compact:
+        print(f"Compacted {compact(args.root)} partition(s)")
+
+    if args.summary:
+        for row in orphaned_gib_by_day(args.root):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
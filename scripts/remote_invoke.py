@@ -6,17 +6,84 @@ Usage:
     python scripts/remote_invoke.py --function-name saverbot-scan-ebs \
                                      --region us-east-1 \
                                      --event-file scripts/sample_event.json
+
+Fan-out mode shards the event's regions (or a "targets" list of events) across
+concurrent invocations and prints a combined manifest:
+    python scripts/remote_invoke.py --function-name saverbot-scan-ebs \
+                                     --region us-east-1 \
+                                     --event-file targets.json \
+                                     --fanout --max-concurrency 8 \
+                                     --output items.ndjson
 """
 
 import argparse
 import json
 import sys
+from collections.abc import Iterable
 from pathlib import Path
+from typing import Any
 
 import boto3
 
+# Add src to path
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from saverbot.config import get_config
+from saverbot.fanout import ShardResult, lambda_client_config, make_shards, run_fanout
+
+
+def run_fanout_mode(lambda_client: Any, args: argparse.Namespace, event: dict[str, Any]) -> None:
+    """Shard the event, invoke concurrently and print the manifest."""
+    targets = event["targets"] if "targets" in event else [event]
+    if args.bypass_cache:
+        targets = [{**target, "bypass_cache": True} for target in targets]
+    shards = make_shards(targets, regions_per_shard=args.regions_per_shard)
+
+    print(
+        f"Invoking Lambda: {args.function_name} in {args.region} "
+        f"({len(shards)} shards, concurrency {args.max_concurrency})...",
+        file=sys.stderr,
+    )
+
+    output = open(args.output, "w") if args.output else None
+    try:
+
+        def on_items(shard_result: ShardResult, items: Iterable[dict[str, Any]]) -> None:
+            count = shard_result.result.get("count", 0)
+            if output is not None:
+                # Items of budgeted shards are read back from their items_location
+                count = 0
+                for item in items:
+                    output.write(json.dumps(item) + "\n")
+                    count += 1
+            print(
+                f"  {shard_result.shard_id}: {count} items "
+                f"in {shard_result.duration_ms} ms ({shard_result.attempts} attempt(s))",
+                file=sys.stderr,
+            )
+
+        manifest = run_fanout(
+            lambda_client,
+            args.function_name,
+            shards,
+            max_concurrency=args.max_concurrency,
+            max_attempts=args.max_attempts,
+            on_items=on_items,
+            s3_client=boto3.client("s3", region_name=args.region),
+        )
+    finally:
+        if output is not None:
+            output.close()
+
+    print(json.dumps(manifest, indent=2))
+
+    if manifest["failed_shards"]:
+        print(f"Error: {manifest['failed_shards']} shard(s) failed", file=sys.stderr)
+        sys.exit(1)
+
 
 def main() -> None:
+    config = get_config()
     parser = argparse.ArgumentParser(description="Invoke a Lambda function remotely")
     parser.add_argument(
         "--function-name",
@@ -34,6 +101,52 @@ def main() -> None:
         type=Path,
         help="Path to JSON file containing the event payload",
     )
+    parser.add_argument(
+        "--bypass-cache",
+        action="store_true",
+        help="Force a fresh scan instead of reusing a cached result",
+    )
+    parser.add_argument(
+        "--endpoint-url",
+        help="Lambda endpoint override (e.g. a local stand-in Lambda)",
+    )
+    parser.add_argument(
+        "--fanout",
+        action="store_true",
+        help="Shard regions/targets across concurrent invocations",
+    )
+    parser.add_argument(
+        "--regions-per-shard",
+        type=int,
+        default=1,
+        help="Regions per invocation in fan-out mode (default: 1)",
+    )
+    parser.add_argument(
+        "--max-concurrency",
+        type=int,
+        default=config.fanout_max_concurrency,
+        help="Maximum in-flight invocations in fan-out mode "
+        "(default: SAVER_FANOUT_MAX_CONCURRENCY or 8)",
+    )
+    parser.add_argument(
+        "--max-attempts",
+        type=int,
+        default=config.fanout_max_attempts,
+        help="Attempts per shard when throttled in fan-out mode "
+        "(default: SAVER_FANOUT_MAX_ATTEMPTS or 5)",
+    )
+    parser.add_argument(
+        "--function-timeout",
+        type=int,
+        default=config.fanout_function_timeout_seconds,
+        help="Timeout of the deployed function in seconds; fan-out mode awaits responses "
+        "slightly longer (default: SAVER_FANOUT_FUNCTION_TIMEOUT_SECONDS or 60)",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="Write merged items as NDJSON to this file in fan-out mode",
+    )
     args = parser.parse_args()
 
     # Read the event payload
@@ -47,8 +160,22 @@ def main() -> None:
         print(f"Error: Invalid JSON in event file: {e}", file=sys.stderr)
         sys.exit(1)
 
-    # Create Lambda client
-    lambda_client = boto3.client("lambda", region_name=args.region)
+    if args.bypass_cache:
+        event["bypass_cache"] = True
+
+    if args.fanout:
+        # Retries are handled by invoke_shard, never by botocore
+        fanout_client = boto3.client(
+            "lambda",
+            region_name=args.region,
+            endpoint_url=args.endpoint_url,
+            config=lambda_client_config(args.function_timeout, args.max_concurrency),
+        )
+        run_fanout_mode(fanout_client, args, event)
+        return
+
+    # Single invocations keep botocore's default retries (e.g. for throttling)
+    lambda_client = boto3.client("lambda", region_name=args.region, endpoint_url=args.endpoint_url)
 
     # Invoke the function
     print(f"Invoking Lambda: {args.function_name} in {args.region}...")
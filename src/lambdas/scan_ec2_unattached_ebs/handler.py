@@ -1,76 +1,201 @@
 """Lambda handler for scanning unattached EBS volumes."""
 
+import os
+import threading
 import time
+import uuid
+from collections import defaultdict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Any
 
+import boto3
+
 from saverbot.assume import assume
-from saverbot.errors import AssumeError
-from saverbot.scanners.ec2_unattached import list_unattached_volumes
+from saverbot.aws import client_config
+from saverbot.cache import CacheBackend, DiskBackend, MemoryBackend, ResultCache, cache_key
+from saverbot.changefeed import (
+    VolumeChange,
+    apply_changes,
+    fill_details,
+    iter_raw_events,
+    parse_volume_event,
+    reconcile,
+)
+from saverbot.config import Config, get_config
+from saverbot.errors import AssumeError, EventValidationError, StateConflictError
+from saverbot.events import parse_scan_event
+from saverbot.scanners.ec2_unattached import (
+    describe_volumes_by_id,
+    iter_unattached_volume_pages,
+)
+from saverbot.scanners.snapshot_index import annotate_volumes, get_snapshot_index
+from saverbot.sinks import FileSink, ItemSink, S3Sink, write_items
+from saverbot.spill import SpillBuffer
+from saverbot.state import (
+    FileStateStore,
+    RegionState,
+    S3StateStore,
+    VolumeStateStore,
+    update_region,
+)
 
+RULE = "ebs-unattached"
 
-def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
-    """Scan for unattached EBS volumes across regions.
+# Process-wide singletons, rebuilt when reload_config() replaces the Config they came from
+_result_cache: ResultCache | None = None
+_result_cache_config: Config | None = None
+_state_store: VolumeStateStore | None = None
+_state_store_config: Config | None = None
 
-    Args:
-        event: Lambda event with role_arn, external_id, and regions
-        context: Lambda context (unused)
 
-    Returns:
-        Scan results with metadata or error dict
+def _get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use or config reload."""
+    global _result_cache, _result_cache_config
+    config = get_config()
+    if _result_cache is None or _result_cache_config is not config:
+        backend: CacheBackend
+        if config.cache_backend == "disk":
+            backend = DiskBackend(config.cache_dir, max_age_seconds=config.cache_ttl_seconds)
+        else:
+            backend = MemoryBackend(max_entries=config.cache_max_entries)
+        _result_cache = ResultCache(backend, ttl_seconds=config.cache_ttl_seconds)
+        _result_cache_config = config
+    return _result_cache
+
+
+def _get_state_store() -> VolumeStateStore | None:
+    """Return the process-wide volume state store, or None if not configured."""
+    global _state_store, _state_store_config
+    config = get_config()
+    if _state_store_config is not config:
+        _state_store = None
+        if config.state_backend == "file":
+            _state_store = FileStateStore(config.state_dir)
+        elif config.state_backend == "s3":
+            _state_store = S3StateStore(
+                boto3.client("s3", config=client_config()),
+                config.state_bucket,
+                config.state_prefix,
+            )
+        _state_store_config = config
+    return _state_store
+
+
+def _in_lambda() -> bool:
+    """Return whether this process runs inside AWS Lambda."""
+    return "AWS_LAMBDA_FUNCTION_NAME" in os.environ
+
+
+def _open_sink(account_id: str) -> ItemSink:
+    """Open the configured sink for a budgeted scan's items."""
+    config = get_config()
+    if config.result_sink == "s3":
+        key = f"{config.result_prefix}{account_id}/{uuid.uuid4().hex}.ndjson"
+        return S3Sink(
+            boto3.client("s3", config=client_config()),
+            config.result_bucket,
+            key,
+            staging_dir=config.spill_dir,
+        )
+    return FileSink(config.result_dir)
+
+
+def _reconcile_regions(
+    store: VolumeStateStore,
+    account_id: str,
+    regions: list[str],
+    ordered_items: Iterable[dict[str, Any]],
+    scanned_at: str,
+) -> None:
+    """Replace the stored state of regions with their scanned items.
+
+    Items arrive grouped by region, so only one region is held at a time.
     """
-    start_time = time.time()
+    remaining = set(regions)
 
-    # Validate required fields
-    if not isinstance(event, dict):
-        return {
-            "error": {
-                "code": "BadRequest",
-                "message": "Event must be a dictionary",
-            }
-        }
+    def save(region: str, region_items: list[dict[str, Any]]) -> None:
+        def replace(state: RegionState) -> bool:
+            reconcile(state, region_items, scanned_at)
+            return True
 
-    role_arn = event.get("role_arn")
-    external_id = event.get("external_id")
-    regions = event.get("regions")
+        update_region(store, account_id, region, replace)
+        remaining.discard(region)
 
-    # Validate role_arn
-    if not role_arn or not isinstance(role_arn, str):
-        return {
-            "error": {
-                "code": "BadRequest",
-                "message": "Missing or invalid 'role_arn' field",
-            }
-        }
+    current: str | None = None
+    region_items: list[dict[str, Any]] = []
+    for item in ordered_items:
+        if item["Region"] != current:
+            if current in remaining:
+                save(current, region_items)
+            current, region_items = item["Region"], []
+        if current in remaining:
+            region_items.append(item)
+    if current in remaining:
+        save(current, region_items)
+    # Regions without unattached volumes
+    for region in sorted(remaining):
+        save(region, [])
 
-    # Validate external_id
-    if not external_id or not isinstance(external_id, str):
-        return {
-            "error": {
-                "code": "BadRequest",
-                "message": "Missing or invalid 'external_id' field",
-            }
-        }
 
-    # Validate regions
-    if not regions or not isinstance(regions, list) or len(regions) == 0:
+def _fill_partial_volumes(
+    store: VolumeStateStore, session: boto3.Session, state: RegionState
+) -> RegionState:
+    """Describe volumes known only from attach/detach events and store their details."""
+    volume_ids = state.partial_volume_ids()
+    if not volume_ids:
+        return state
+    checked_at = datetime.now(timezone.utc).isoformat()
+    items = describe_volumes_by_id(session, state.region, volume_ids)
+
+    def fill(current: RegionState) -> bool:
+        return fill_details(current, volume_ids, items, checked_at)
+
+    return update_region(store, state.account_id, state.region, fill)
+
+
+def _scan(
+    role_arn: str,
+    external_id: str,
+    regions: list[str],
+    annotate_snapshots: bool = False,
+    source: str = "api",
+) -> dict[str, Any]:
+    """Assume the target role and scan all regions.
+
+    With source "state", regions already reconciled in the volume state store
+    are read from it instead of calling describe_volumes. The role is assumed
+    either way, so a wrong role or external ID never returns stored state.
+
+    Returns:
+        Scan results with metadata or error dict
+    """
+    start_time = time.time()
+    started_at = datetime.now(timezone.utc).isoformat()
+    account_id = role_arn.split(":")[4]
+    config = get_config()
+    if config.memory_budget_bytes and config.result_sink == "file" and _in_lambda():
+        # Files would fill the container's /tmp and are unreachable by the caller
         return {
             "error": {
-                "code": "BadRequest",
-                "message": "Missing or invalid 'regions' field (must be non-empty list)",
+                "code": "ResultSinkNotConfigured",
+                "message": "Set SAVER_RESULT_SINK=s3 and SAVER_RESULT_BUCKET to use "
+                "SAVER_MEMORY_BUDGET_BYTES inside Lambda",
             }
         }
+    store = _get_state_store()
 
-    for region in regions:
-        if not isinstance(region, str):
-            return {
-                "error": {
-                    "code": "BadRequest",
-                    "message": "All regions must be strings",
-                }
-            }
+    states: dict[str, RegionState] = {}
+    if source == "state" and store is not None:
+        for region in regions:
+            state = store.load(account_id, region)
+            if state.reconciled_at is not None:
+                states[region] = state
+    api_regions = [region for region in regions if region not in states]
 
-    # Assume role
+    # Assume role even when every region comes from state: a successful assume
+    # is what proves the caller may read this account's inventory
     try:
         session = assume(role_arn, external_id)
     except AssumeError as e:
@@ -81,11 +206,69 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
             }
         }
 
-    # Scan all regions
-    all_items = []
-    for region in regions:
-        volumes = list_unattached_volumes(session, region)
-        all_items.extend(volumes)
+    # Scan regions concurrently, returning items in request-region then volume order
+    region_order = {region: i for i, region in enumerate(regions)}
+
+    def sort_key(item: dict[str, Any]) -> tuple[int, str]:
+        return region_order[item["Region"]], item["VolumeId"]
+
+    items: SpillBuffer | list[dict[str, Any]]
+    if config.memory_budget_bytes:
+        items = SpillBuffer(config.memory_budget_bytes, key=sort_key, directory=config.spill_dir)
+    else:
+        items = []
+
+    lock = threading.Lock()
+
+    def scan_region(region: str) -> None:
+        pages: Iterable[list[dict[str, Any]]]
+        if region in states:
+            assert store is not None
+            pages = [_fill_partial_volumes(store, session, states[region]).unattached_items()]
+        else:
+            pages = iter_unattached_volume_pages(session, region)
+        index = None
+        for volumes in pages:
+            if annotate_snapshots and volumes:
+                if index is None:
+                    index = get_snapshot_index(
+                        session,
+                        region,
+                        account_id,
+                        ttl_seconds=config.snapshot_index_ttl_seconds,
+                    )
+                annotate_volumes(volumes, index, recent_days=config.snapshot_recent_days)
+            with lock:
+                items.extend(volumes)
+
+    try:
+        workers = min(config.scan_max_workers, len(regions))
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(scan_region, regions))
+        else:
+            for region in regions:
+                scan_region(region)
+
+        # Budgeted scans stream items to a sink rather than returning them inline
+        output: dict[str, Any]
+        ordered: Iterable[dict[str, Any]]
+        if isinstance(items, SpillBuffer):
+            spilled_runs = items.spilled_runs
+            ordered = items
+            location, count = write_items(items, _open_sink(account_id))
+            output = {"items_location": location, "count": count}
+        else:
+            spilled_runs = 0
+            ordered = sorted(items, key=sort_key)
+            output = {"items": ordered, "count": len(ordered)}
+
+        # Full scans reconcile the state store so later requests can use it
+        if store is not None and api_regions:
+            _reconcile_regions(store, account_id, api_regions, ordered, started_at)
+    finally:
+        if isinstance(items, SpillBuffer):
+            items.close()
 
     # Calculate duration
     duration_ms = int((time.time() - start_time) * 1000)
@@ -94,12 +277,156 @@ def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
     return {
         "meta": {
             "service": "ec2",
-            "rule": "ebs-unattached",
+            "rule": RULE,
+            "account_id": account_id,
             "regions": regions,
             "scanned_at": datetime.now(timezone.utc).isoformat(),
             "duration_ms": duration_ms,
+            "spilled_runs": spilled_runs,
+            "sources": {region: "state" if region in states else "api" for region in regions},
         },
-        "items": all_items,
-        "count": len(all_items),
+        **output,
     }
 
+
+def handler(event: dict[str, Any], context: Any) -> dict[str, Any]:
+    """Scan for unattached EBS volumes across regions.
+
+    Args:
+        event: Lambda event with role_arn, external_id, regions, and optional
+            bypass_cache, annotate_snapshots and source fields
+        context: Lambda context (unused)
+
+    Returns:
+        Scan results with metadata or error dict
+    """
+    try:
+        scan_event = parse_scan_event(event)
+    except EventValidationError as e:
+        return {
+            "error": {
+                "code": e.code,
+                "message": e.message,
+                "details": e.errors,
+            }
+        }
+
+    role_arn = scan_event.role_arn
+    external_id = scan_event.external_id
+    regions = scan_event.regions
+
+    # Identical (role, regions, rule) requests share one cached result
+    key = cache_key(
+        {
+            "rule": RULE,
+            "role_arn": role_arn,
+            "external_id": external_id,
+            "regions": sorted(regions),
+            "annotate_snapshots": scan_event.annotate_snapshots,
+            "source": scan_event.source,
+        }
+    )
+    result, age = _get_result_cache().get_or_compute(
+        key,
+        lambda: _scan(
+            role_arn, external_id, regions, scan_event.annotate_snapshots, scan_event.source
+        ),
+        bypass=scan_event.bypass_cache,
+        # Streamed results point at a per-scan object; only inline results are reused
+        should_store=lambda r: "error" not in r and "items_location" not in r,
+    )
+
+    if "error" in result:
+        return result
+
+    meta = dict(result["meta"])
+    meta["regions"] = regions
+    meta["cached"] = age is not None
+    meta["cache_age_seconds"] = round(age, 3) if age is not None else 0.0
+    result = {**result, "meta": meta}
+    if age is not None and "items" in result:
+        # The key ignores region order; return items in this request's order
+        region_order = {region: i for i, region in enumerate(regions)}
+        result["items"] = sorted(result["items"], key=lambda item: region_order[item["Region"]])
+    return result
+
+
+def _apply_region_changes(
+    store: VolumeStateStore, account_id: str, region: str, changes: list[VolumeChange]
+) -> int:
+    """Apply one region's changes to the store, returning how many took effect."""
+    applied = 0
+
+    def mutate(state: RegionState) -> bool:
+        nonlocal applied
+        applied = apply_changes(state, changes)
+        return applied > 0
+
+    update_region(store, account_id, region, mutate)
+    return applied
+
+
+def volume_events_handler(event: Any, context: Any) -> dict[str, Any]:
+    """Apply EBS volume lifecycle events to the volume state store.
+
+    For SQS batches, records whose body is not JSON or whose region could not
+    be saved are returned in batchItemFailures (for ReportBatchItemFailures),
+    so one bad record does not fail the whole batch.
+
+    Args:
+        event: EventBridge event for CreateVolume/DeleteVolume/AttachVolume/
+            DetachVolume, an SQS batch of them, or {"events": [...]}
+        context: Lambda context (unused)
+
+    Returns:
+        Counts of received and applied events plus batchItemFailures, or error dict
+    """
+    start_time = time.time()
+    store = _get_state_store()
+    if store is None:
+        return {
+            "error": {
+                "code": "StateStoreNotConfigured",
+                "message": "Set SAVER_STATE_BACKEND to 'file' or 's3' to apply volume events",
+            }
+        }
+
+    received = 0
+    failed: set[str] = set()
+    changes: dict[tuple[str, str], list[VolumeChange]] = defaultdict(list)
+    message_ids: dict[tuple[str, str], set[str | None]] = defaultdict(set)
+    for message_id, raw in iter_raw_events(event):
+        received += 1
+        if raw is None:
+            assert message_id is not None
+            failed.add(message_id)
+            continue
+        change = parse_volume_event(raw)
+        if change is not None:
+            changes[(change.account_id, change.region)].append(change)
+            message_ids[(change.account_id, change.region)].add(message_id)
+
+    applied = 0
+    for (account_id, region), region_changes in sorted(changes.items()):
+        try:
+            applied += _apply_region_changes(store, account_id, region, region_changes)
+        except StateConflictError:
+            # Only SQS can redeliver just this region's records
+            ids = message_ids[(account_id, region)]
+            if None in ids:
+                raise
+            failed.update(message_id for message_id in ids if message_id is not None)
+
+    return {
+        "meta": {
+            "service": "ec2",
+            "rule": RULE,
+            "received": received,
+            "applied": applied,
+            "ignored": received - applied - len(failed),
+            "failed": len(failed),
+            "regions": [f"{account_id}/{region}" for account_id, region in sorted(changes)],
+            "duration_ms": int((time.time() - start_time) * 1000),
+        },
+        "batchItemFailures": [{"itemIdentifier": message_id} for message_id in sorted(failed)],
+    }
@@ -3,16 +3,25 @@
 import boto3
 from botocore.exceptions import ClientError
 
+from saverbot.aws import client_config
+from saverbot.config import get_config
 from saverbot.errors import AssumeError
 
 
-def assume(role_arn: str, external_id: str, duration: int = 900) -> boto3.Session:
+def assume(
+    role_arn: str,
+    external_id: str,
+    duration: int | None = None,
+    session_name: str | None = None,
+) -> boto3.Session:
     """Assume an AWS IAM role and return a session with temporary credentials.
 
     Args:
         role_arn: ARN of the role to assume
         external_id: External ID for assume role
-        duration: Session duration in seconds (default: 900, min: 900, max: 43200)
+        duration: Session duration in seconds (default: Config.sts_duration_seconds,
+            min: 900, max: 43200)
+        session_name: Role session name (default: Config.sts_session_name)
 
     Returns:
         boto3.Session configured with temporary credentials
@@ -20,6 +29,12 @@ def assume(role_arn: str, external_id: str, duration: int = 900) -> boto3.Sessio
     Raises:
         AssumeError: If assume role fails with error code and message
     """
+    config = get_config()
+    if duration is None:
+        duration = config.sts_duration_seconds
+    if session_name is None:
+        session_name = config.sts_session_name
+
     if duration < 900 or duration > 43200:
         raise AssumeError(
             code="InvalidParameter",
@@ -27,10 +42,10 @@ def assume(role_arn: str, external_id: str, duration: int = 900) -> boto3.Sessio
         )
 
     try:
-        sts_client = boto3.client("sts")
+        sts_client = boto3.client("sts", config=client_config())
         response = sts_client.assume_role(
             RoleArn=role_arn,
-            RoleSessionName="saverbot-session",
+            RoleSessionName=session_name,
             ExternalId=external_id,
             DurationSeconds=duration,
         )
@@ -0,0 +1,45 @@
+"""Shared boto3 client construction."""
+
+import threading
+from typing import TYPE_CHECKING
+
+import boto3
+from botocore.config import Config as BotoConfig
+
+from saverbot.config import get_config
+
+if TYPE_CHECKING:
+    from mypy_boto3_ec2 import EC2Client
+    from mypy_boto3_ec2.type_defs import PaginatorConfigTypeDef
+
+# boto3 sessions are not thread-safe when creating clients; the clients are
+_client_lock = threading.Lock()
+
+
+def client_config() -> BotoConfig:
+    """Return the botocore retry and connection settings from Config."""
+    config = get_config()
+    return BotoConfig(
+        retries={"max_attempts": config.aws_max_attempts, "mode": config.aws_retry_mode},
+        max_pool_connections=config.aws_max_pool_connections,
+    )
+
+
+def ec2_client(session: boto3.Session, region: str) -> "EC2Client":
+    """Create an EC2 client for a region with the configured retry settings.
+
+    Args:
+        session: Authenticated boto3 session
+        region: AWS region
+
+    Returns:
+        EC2 client, safe to share across threads
+    """
+    with _client_lock:
+        return session.client("ec2", region_name=region, config=client_config())
+
+
+def pagination_config() -> "PaginatorConfigTypeDef":
+    """Return paginator settings with the configured page size, if any."""
+    page_size = get_config().scan_page_size
+    return {"PageSize": page_size} if page_size else {}
@@ -0,0 +1,234 @@
+"""Content-addressed result cache for scan requests."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, Protocol
+
+
+def cache_key(payload: dict[str, Any]) -> str:
+    """Build a canonical content hash for a normalized request.
+
+    Args:
+        payload: Normalized request fields (JSON-serializable)
+
+    Returns:
+        Hex-encoded SHA-256 of the canonical JSON encoding
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """Storage backend for cached results."""
+
+    def get(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        """Return (stored_at, value) for a key, or None if absent."""
+        ...
+
+    def set(self, key: str, value: dict[str, Any], stored_at: float) -> None:
+        """Store a value under a key."""
+        ...
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        ...
+
+
+class MemoryBackend:
+    """In-process LRU backend, shared across warm invocations."""
+
+    def __init__(self, max_entries: int = 128) -> None:
+        """Initialize MemoryBackend.
+
+        Args:
+            max_entries: Maximum number of entries before evicting the oldest
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        """Return (stored_at, value) for a key, or None if absent."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: dict[str, Any], stored_at: float) -> None:
+        """Store a value under a key."""
+        with self._lock:
+            self._entries[key] = (stored_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+class DiskBackend:
+    """JSON-file backend, one file per key (e.g. under /tmp in Lambda)."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_age_seconds: float | None = None,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize DiskBackend.
+
+        Args:
+            directory: Directory to store cache files in (created if missing)
+            max_age_seconds: Delete entries older than this on each set (None keeps all)
+            clock: Time source, in seconds since the epoch
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age_seconds = max_age_seconds
+        self.clock = clock
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> tuple[float, dict[str, Any]] | None:
+        """Return (stored_at, value) for a key, or None if absent or unreadable."""
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                entry = json.load(f)
+            return float(entry["stored_at"]), entry["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def set(self, key: str, value: dict[str, Any], stored_at: float) -> None:
+        """Store a value under a key, replacing the file atomically."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"stored_at": stored_at, "value": value}, f)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self.prune()
+
+    def prune(self) -> int:
+        """Delete entries older than max_age_seconds.
+
+        Returns:
+            Number of files removed
+        """
+        if self.max_age_seconds is None:
+            return 0
+        cutoff = self.clock() - self.max_age_seconds
+        removed = 0
+        for path in self.directory.glob("*.json"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+            except FileNotFoundError:
+                # Removed concurrently
+                continue
+        return removed
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present."""
+        self._path(key).unlink(missing_ok=True)
+
+
+class _Call:
+    """An in-flight computation that concurrent callers wait on."""
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: dict[str, Any] | None = None
+        self.error: BaseException | None = None
+
+
+class ResultCache:
+    """TTL result cache with single-flight coalescing of identical requests."""
+
+    def __init__(
+        self,
+        backend: CacheBackend,
+        ttl_seconds: float,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        """Initialize ResultCache.
+
+        Args:
+            backend: Storage backend
+            ttl_seconds: Maximum age of a reusable entry (0 disables reads and writes)
+            clock: Time source, in seconds since the epoch
+        """
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._inflight: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], dict[str, Any]],
+        bypass: bool = False,
+        should_store: Callable[[dict[str, Any]], bool] = lambda _: True,
+    ) -> tuple[dict[str, Any], float | None]:
+        """Return a cached result or compute it once for all concurrent callers.
+
+        Args:
+            key: Cache key (see cache_key)
+            compute: Function producing the result on a miss
+            bypass: Skip the lookup and refresh the entry with a new result
+            should_store: Predicate deciding whether a computed result is cached
+
+        Returns:
+            Tuple of (result, age in seconds if served from cache else None)
+        """
+        enabled = self.ttl_seconds > 0
+
+        if enabled and not bypass:
+            entry = self.backend.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                age = self.clock() - stored_at
+                if 0 <= age <= self.ttl_seconds:
+                    return value, age
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if call is None:
+                call = _Call()
+                self._inflight[key] = call
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            assert call.result is not None
+            return call.result, 0.0
+
+        try:
+            result = compute()
+            call.result = result
+            if enabled and should_store(result):
+                self.backend.set(key, result, self.clock())
+            return result, None
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
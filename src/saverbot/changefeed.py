@@ -0,0 +1,250 @@
+"""Apply EBS volume lifecycle events (CloudTrail via EventBridge) to volume state.
+
+Volumes left behind by TerminateInstances (DeleteOnTermination=false) emit no
+DetachVolume event, so they only appear after the next reconciling scan.
+"""
+
+import json
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+from saverbot.state import ITEM_FIELDS, RegionState
+
+VOLUME_EVENT_NAMES = frozenset({"CreateVolume", "DeleteVolume", "AttachVolume", "DetachVolume"})
+
+# State a volume is in after each event
+_STATE_AFTER = {
+    "CreateVolume": "available",
+    "DeleteVolume": "deleted",
+    "AttachVolume": "in-use",
+    "DetachVolume": "available",
+}
+
+# EC2 volume states stored under another name (others, e.g. "in-use", are kept)
+_DESCRIBED_STATE = {"deleting": "deleted"}
+
+
+@dataclass(frozen=True)
+class VolumeChange:
+    """One volume lifecycle event."""
+
+    account_id: str
+    region: str
+    volume_id: str
+    event_name: str
+    event_time: datetime
+    # Scanner item fields known from the event (CreateVolume only)
+    details: dict[str, Any] | None = None
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, accepting a trailing Z."""
+    parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _create_time(value: Any) -> str | None:
+    # CloudTrail reports createTime as epoch milliseconds
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value / 1000, tz=timezone.utc).isoformat()
+    if isinstance(value, str):
+        return parse_time(value).isoformat()
+    return None
+
+
+def iter_raw_events(
+    payload: Any, message_id: str | None = None
+) -> Iterator[tuple[str | None, dict[str, Any] | None]]:
+    """Yield (SQS message ID, EventBridge event) pairs from a Lambda payload.
+
+    Accepts a single EventBridge event, an SQS batch ({"Records": [...]} with
+    EventBridge events as message bodies), {"events": [...]} or a plain list.
+    The message ID is None outside SQS. The event is None for a record whose
+    body is not JSON, so that record alone can be reported as failed.
+    """
+    if isinstance(payload, list):
+        for item in payload:
+            yield from iter_raw_events(item, message_id)
+    elif isinstance(payload, dict):
+        if "Records" in payload:
+            for record in payload["Records"]:
+                record_id = record.get("messageId")
+                try:
+                    body = json.loads(record["body"])
+                except (KeyError, TypeError, ValueError):
+                    yield record_id, None
+                    continue
+                yield from iter_raw_events(body, record_id)
+        elif "events" in payload:
+            yield from iter_raw_events(payload["events"], message_id)
+        else:
+            yield message_id, payload
+
+
+def parse_volume_event(event: dict[str, Any]) -> VolumeChange | None:
+    """Convert an EventBridge CloudTrail event into a VolumeChange.
+
+    Returns:
+        VolumeChange, or None for unrelated or failed API calls
+    """
+    detail = event.get("detail")
+    if not isinstance(detail, dict):
+        return None
+    event_name = detail.get("eventName")
+    if event_name not in VOLUME_EVENT_NAMES or detail.get("errorCode"):
+        return None
+
+    request = detail.get("requestParameters") or {}
+    response = detail.get("responseElements") or {}
+    volume_id = response.get("volumeId") or request.get("volumeId")
+    account_id = event.get("account") or detail.get("recipientAccountId")
+    region = event.get("region") or detail.get("awsRegion")
+    event_time = event.get("time") or detail.get("eventTime")
+    if not (volume_id and account_id and region and event_time):
+        return None
+
+    details = None
+    if event_name == "CreateVolume":
+        tags = {
+            tag["key"]: tag["value"]
+            for tag in (response.get("tagSet") or {}).get("items", [])
+        }
+        details = {
+            "Size": int(response["size"]) if response.get("size") is not None else None,
+            "SnapshotId": response.get("snapshotId") or None,
+            "CreateTime": _create_time(response.get("createTime")),
+            "Tags": tags,
+        }
+
+    return VolumeChange(
+        account_id=account_id,
+        region=region,
+        volume_id=volume_id,
+        event_name=event_name,
+        event_time=parse_time(event_time),
+        details=details,
+    )
+
+
+def apply_changes(state: RegionState, changes: list[VolumeChange]) -> int:
+    """Apply changes to a region's state in place, in event-time order.
+
+    Changes older than the last reconciliation, or than the last change applied
+    to the same volume, are skipped so replays and out-of-order delivery are
+    harmless.
+
+    Returns:
+        Number of changes applied
+    """
+    reconciled_at = parse_time(state.reconciled_at) if state.reconciled_at else None
+    applied = 0
+
+    for change in sorted(changes, key=lambda c: c.event_time):
+        if reconciled_at is not None and change.event_time <= reconciled_at:
+            continue
+        entry = state.volumes.get(change.volume_id)
+        if entry is not None and change.event_time <= parse_time(entry["UpdatedAt"]):
+            continue
+
+        if entry is None:
+            # Attach/detach of a volume first seen here (in use when last
+            # reconciled): details are filled in by fill_details()
+            entry = {
+                "Region": state.region,
+                "VolumeId": change.volume_id,
+                "Size": None,
+                "SnapshotId": None,
+                "CreateTime": None,
+                "Tags": {},
+                "Partial": True,
+            }
+            state.volumes[change.volume_id] = entry
+        if change.details is not None:
+            entry.update(change.details)
+            entry.pop("Partial", None)
+        entry["State"] = _STATE_AFTER[change.event_name]
+        entry["UpdatedAt"] = change.event_time.isoformat()
+        applied += 1
+
+    return applied
+
+
+def reconcile(state: RegionState, items: list[dict[str, Any]], scanned_at: str) -> None:
+    """Replace a region's state with the result of a full scan.
+
+    Entries changed by events after scanned_at are kept, since the scan may
+    not have seen them.
+
+    Args:
+        state: State to overwrite in place
+        items: Scanner items for state.region (all unattached volumes)
+        scanned_at: ISO time the scan started
+    """
+    started = parse_time(scanned_at)
+    newer = {
+        volume_id: entry
+        for volume_id, entry in state.volumes.items()
+        if parse_time(entry["UpdatedAt"]) > started
+    }
+    state.reconciled_at = scanned_at
+    state.volumes = {
+        item["VolumeId"]: {
+            **{name: item.get(name) for name in ITEM_FIELDS},
+            "State": "available",
+            "UpdatedAt": scanned_at,
+        }
+        for item in items
+    }
+    state.volumes.update(newer)
+
+
+def fill_details(
+    state: RegionState,
+    volume_ids: list[str],
+    items: list[dict[str, Any]],
+    checked_at: str,
+) -> bool:
+    """Complete partial entries from a describe_volumes by ID.
+
+    The described State replaces the entry's unless an event newer than the
+    describe call was applied since, so a volume attached again before its
+    AttachVolume event arrives (or whose event was lost) is not reported as
+    unattached.
+
+    Args:
+        state: State to update in place
+        volume_ids: Partial volume IDs that were described
+        items: Items returned for them, with the EC2 State (missing volumes
+            no longer exist)
+        checked_at: ISO time the volumes were described
+
+    Returns:
+        Whether any entry changed
+    """
+    found = {item["VolumeId"]: item for item in items}
+    checked = parse_time(checked_at)
+    changed = False
+
+    for volume_id in volume_ids:
+        entry = state.volumes.get(volume_id)
+        if entry is None or not entry.get("Partial"):
+            continue
+        item = found.get(volume_id)
+        newer_than_entry = checked > parse_time(entry["UpdatedAt"])
+        if item is not None:
+            entry.update({name: item.get(name) for name in ITEM_FIELDS})
+            if newer_than_entry:
+                entry["State"] = _DESCRIBED_STATE.get(item["State"], item["State"])
+                entry["UpdatedAt"] = checked_at
+        elif newer_than_entry:
+            entry["State"] = "deleted"
+            entry["UpdatedAt"] = checked_at
+        else:
+            # Changed after it was described; try again next time
+            continue
+        entry.pop("Partial")
+        changed = True
+
+    return changed
@@ -1,28 +1,84 @@
 """Configuration management using pydantic-settings."""
 
+import functools
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Config(BaseSettings):
-    """Application configuration."""
+    """Application configuration.
+
+    Loaded once per process by get_config() and immutable afterwards; every
+    field can be set with a SAVER_-prefixed environment variable.
+    """
 
     model_config = SettingsConfigDict(
         env_prefix="SAVER_",
         env_file=".env",
         env_file_encoding="utf-8",
         case_sensitive=False,
+        frozen=True,
     )
 
     # AWS Configuration
     aws_region: str = "us-east-1"
     log_level: str = "INFO"
 
+    # AWS client Configuration
+    aws_max_attempts: int = 5
+    aws_retry_mode: Literal["legacy", "standard", "adaptive"] = "adaptive"  # adaptive rate-limits
+    aws_max_pool_connections: int = 10
+
     # STS Configuration
     sts_duration_seconds: int = 900
     sts_session_name: str = "saverbot-session"
 
+    # Scan Configuration
+    scan_max_workers: int = 4  # regions scanned concurrently
+    scan_page_size: int | None = None  # MaxResults per describe call (None: API default)
+
+    # Result cache Configuration
+    cache_backend: Literal["memory", "disk"] = "memory"
+    cache_dir: str = "/tmp/saverbot-cache"
+    cache_ttl_seconds: int = 300
+    cache_max_entries: int = 128  # memory backend only; oldest entries are evicted
+
+    # Snapshot index Configuration
+    snapshot_index_ttl_seconds: int = 900
+    snapshot_recent_days: int = 30
+
+    # Memory budget Configuration (0 keeps all results in memory and returns them inline)
+    memory_budget_bytes: int = 0
+    spill_dir: str = "/tmp"
+    result_sink: Literal["file", "s3"] = "file"  # where budgeted results are streamed
+    result_dir: str = "/tmp/saverbot-results"
+    result_bucket: str = ""
+    result_prefix: str = "scan-results/"
 
+    # Volume state Configuration (event-driven updates; "none" disables)
+    state_backend: Literal["none", "file", "s3"] = "none"
+    state_dir: str = "/tmp/saverbot-state"
+    state_bucket: str = ""
+    state_prefix: str = "volume-state/"
+
+    # Fan-out Configuration (scripts/remote_invoke.py defaults)
+    fanout_max_concurrency: int = 8
+    fanout_max_attempts: int = 5
+    fanout_function_timeout_seconds: int = 60  # deployed function timeout (read timeout base)
+
+
+@functools.cache
 def get_config() -> Config:
-    """Get application configuration."""
+    """Get application configuration, loading it on first use."""
     return Config()
 
+
+def reload_config() -> Config:
+    """Re-read the environment and .env file and return the new configuration.
+
+    Objects built from the previous Config (such as the handler's result cache
+    and state store) are rebuilt on their next use.
+    """
+    get_config.cache_clear()
+    return get_config()
@@ -19,3 +19,39 @@ class AssumeError(Exception):
         """Return string representation."""
         return f"AssumeError(code={self.code!r}, message={self.message!r})"
 
+
+
+class EventValidationError(Exception):
+    """Error raised when a Lambda event fails schema validation."""
+
+    def __init__(self, errors: list[dict[str, str]]) -> None:
+        """Initialize EventValidationError.
+
+        Args:
+            errors: One {"field": ..., "message": ...} entry per problem found
+        """
+        self.code = "BadRequest"
+        self.errors = errors
+        self.message = "; ".join(
+            f"{e['field']}: {e['message']}" if e["field"] else e["message"] for e in errors
+        )
+        super().__init__(f"{self.code}: {self.message}")
+
+    def __repr__(self) -> str:
+        """Return string representation."""
+        return f"EventValidationError(errors={self.errors!r})"
+
+
+class StateConflictError(Exception):
+    """Error raised when stored volume state changed since it was loaded."""
+
+    def __init__(self, account_id: str, region: str) -> None:
+        """Initialize StateConflictError.
+
+        Args:
+            account_id: Account of the conflicting state
+            region: Region of the conflicting state
+        """
+        self.account_id = account_id
+        self.region = region
+        super().__init__(f"Volume state for {account_id}/{region} was modified concurrently")
@@ -0,0 +1,125 @@
+"""Lambda event schemas, compiled once at import."""
+
+import re
+from typing import Annotated, Any, Literal
+
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, ValidationError
+
+from saverbot.errors import EventValidationError
+
+KNOWN_REGIONS = frozenset(
+    {
+        "af-south-1",
+        "ap-east-1",
+        "ap-east-2",
+        "ap-northeast-1",
+        "ap-northeast-2",
+        "ap-northeast-3",
+        "ap-south-1",
+        "ap-south-2",
+        "ap-southeast-1",
+        "ap-southeast-2",
+        "ap-southeast-3",
+        "ap-southeast-4",
+        "ap-southeast-5",
+        "ap-southeast-6",
+        "ap-southeast-7",
+        "ca-central-1",
+        "ca-west-1",
+        "cn-north-1",
+        "cn-northwest-1",
+        "eu-central-1",
+        "eu-central-2",
+        "eu-north-1",
+        "eu-south-1",
+        "eu-south-2",
+        "eu-west-1",
+        "eu-west-2",
+        "eu-west-3",
+        "il-central-1",
+        "me-central-1",
+        "me-south-1",
+        "mx-central-1",
+        "sa-east-1",
+        "us-east-1",
+        "us-east-2",
+        "us-gov-east-1",
+        "us-gov-west-1",
+        "us-west-1",
+        "us-west-2",
+    }
+)
+
+_ROLE_ARN_RE = re.compile(r"arn:aws(-cn|-us-gov)?:iam::\d{12}:role/[\w+=,.@/-]{1,512}", re.ASCII)
+_EXTERNAL_ID_RE = re.compile(r"[\w+=,.@:/-]{2,1224}", re.ASCII)
+
+
+def _check_region(region: str) -> str:
+    if region not in KNOWN_REGIONS:
+        raise ValueError(f"Unknown region {region!r}")
+    return region
+
+
+def _check_role_arn(role_arn: str) -> str:
+    if not _ROLE_ARN_RE.fullmatch(role_arn):
+        raise ValueError("Invalid IAM role ARN")
+    return role_arn
+
+
+def _check_external_id(external_id: str) -> str:
+    if not _EXTERNAL_ID_RE.fullmatch(external_id):
+        raise ValueError("External ID must be 2-1224 characters of [A-Za-z0-9+=,.@:/_-]")
+    return external_id
+
+
+Region = Annotated[str, AfterValidator(_check_region)]
+RoleArn = Annotated[str, AfterValidator(_check_role_arn)]
+ExternalId = Annotated[str, AfterValidator(_check_external_id)]
+
+
+class ScanEvent(BaseModel):
+    """Event accepted by the scan_ec2_unattached_ebs handler."""
+
+    model_config = ConfigDict(strict=True, frozen=True, extra="ignore")
+
+    role_arn: RoleArn
+    external_id: ExternalId
+    regions: Annotated[list[Region], Field(min_length=1)]
+    bypass_cache: bool = False
+    annotate_snapshots: bool = False
+    # "state": serve reconciled regions from the volume state store
+    source: Literal["api", "state"] = "api"
+
+
+def _format_errors(exc: ValidationError) -> list[dict[str, str]]:
+    """Flatten pydantic errors into {"field", "message"} entries."""
+    errors = []
+    for error in exc.errors(include_url=False, include_context=False, include_input=False):
+        field = ""
+        for part in error["loc"]:
+            field += f"[{part}]" if isinstance(part, int) else (f".{part}" if field else part)
+        message = error["msg"]
+        if error["type"] == "model_type":
+            message = "Event must be a dictionary"
+        elif error["type"] == "value_error":
+            message = message.removeprefix("Value error, ")
+        errors.append({"field": field, "message": message})
+    return errors
+
+
+def parse_scan_event(event: Any) -> ScanEvent:
+    """Validate a raw Lambda event.
+
+    Args:
+        event: Raw event as received by the handler
+
+    Returns:
+        Validated, immutable ScanEvent
+
+    Raises:
+        EventValidationError: With every problem found, not just the first
+    """
+    try:
+        return ScanEvent.model_validate(event)
+    except ValidationError as e:
+        raise EventValidationError(_format_errors(e)) from e
@@ -0,0 +1,265 @@
+"""Concurrent fan-out of scan events across Lambda invocations."""
+
+import json
+import random
+import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+from botocore.config import Config as BotoConfig
+from botocore.exceptions import (
+    BotoCoreError,
+    ClientError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+)
+
+from saverbot.sinks import result_items
+
+RETRYABLE_ERROR_CODES = frozenset(
+    {
+        "TooManyRequestsException",
+        "ThrottlingException",
+        "Throttling",
+        "ServiceException",
+    }
+)
+
+# Errors raised before the request reached Lambda, so retrying cannot re-run a scan
+_RETRYABLE_CONNECTION_ERRORS = (EndpointConnectionError, ConnectTimeoutError)
+
+# Extra wait beyond the function timeout before giving up on a response
+_READ_TIMEOUT_MARGIN_SECONDS = 10
+
+
+def lambda_client_config(function_timeout_seconds: int, max_concurrency: int) -> BotoConfig:
+    """Return Lambda client settings for fan-out.
+
+    botocore retries are disabled so invoke_shard owns every retry, and the
+    read timeout outlasts the function so a running scan is never re-invoked.
+
+    Args:
+        function_timeout_seconds: Timeout of the invoked function
+        max_concurrency: Maximum in-flight invocations (sizes the connection pool)
+    """
+    return BotoConfig(
+        retries={"total_max_attempts": 1},
+        read_timeout=function_timeout_seconds + _READ_TIMEOUT_MARGIN_SECONDS,
+        max_pool_connections=max_concurrency,
+    )
+
+
+@dataclass
+class Shard:
+    """One Lambda invocation covering a slice of a target's regions."""
+
+    shard_id: str
+    event: dict[str, Any]
+
+
+@dataclass
+class ShardResult:
+    """Outcome of invoking one shard."""
+
+    shard_id: str
+    ok: bool
+    attempts: int
+    duration_ms: int
+    result: dict[str, Any] = field(default_factory=dict)
+    error: dict[str, str] | None = None
+
+    def manifest_entry(self) -> dict[str, Any]:
+        """Return the per-shard manifest record (without items)."""
+        entry: dict[str, Any] = {
+            "shard_id": self.shard_id,
+            "status": "ok" if self.ok else "error",
+            "attempts": self.attempts,
+            "duration_ms": self.duration_ms,
+            "count": self.result.get("count", 0) if self.ok else 0,
+        }
+        if self.ok:
+            entry["cached"] = self.result.get("meta", {}).get("cached", False)
+            if "items_location" in self.result:
+                # Memory-budgeted shards stream items to a sink instead of returning them
+                entry["items_location"] = self.result["items_location"]
+        if self.error is not None:
+            entry["error"] = self.error
+        return entry
+
+
+def make_shards(targets: list[dict[str, Any]], regions_per_shard: int = 1) -> list[Shard]:
+    """Split targets into shards of at most regions_per_shard regions each.
+
+    Args:
+        targets: Scan events (role_arn, external_id, regions, options)
+        regions_per_shard: Maximum regions per invocation
+
+    Returns:
+        Shards in target order
+    """
+    if regions_per_shard < 1:
+        raise ValueError("regions_per_shard must be at least 1")
+
+    shards = []
+    for t, target in enumerate(targets):
+        regions = target["regions"]
+        for start in range(0, len(regions), regions_per_shard):
+            chunk = regions[start : start + regions_per_shard]
+            shard_id = f"{t}:{','.join(chunk)}"
+            shards.append(Shard(shard_id=shard_id, event={**target, "regions": chunk}))
+    return shards
+
+
+def _invoke_once(client: Any, function_name: str, event: dict[str, Any]) -> dict[str, Any]:
+    response = client.invoke(FunctionName=function_name, Payload=json.dumps(event))
+    payload = response["Payload"].read().decode("utf-8")
+    status_code = response.get("StatusCode", 0)
+    if response.get("FunctionError") or status_code != 200:
+        raise RuntimeError(f"Lambda failed with status {status_code}: {payload}")
+    result: dict[str, Any] = json.loads(payload)
+    return result
+
+
+def invoke_shard(
+    client: Any,
+    function_name: str,
+    shard: Shard,
+    max_attempts: int = 5,
+    backoff_base: float = 0.5,
+    sleep: Callable[[float], None] = time.sleep,
+) -> ShardResult:
+    """Invoke one shard, retrying throttled calls with jittered exponential backoff.
+
+    Handled errors returned by the function (an "error" payload), unhandled
+    function errors and read timeouts are reported without retrying.
+
+    Args:
+        client: boto3 Lambda client with botocore retries disabled
+            (see lambda_client_config)
+        function_name: Function to invoke
+        shard: Shard to run
+        max_attempts: Maximum invocations including the first
+        backoff_base: Base delay in seconds (doubled per retry)
+        sleep: Sleep function
+
+    Returns:
+        ShardResult (never raises for invocation failures)
+    """
+    start = time.monotonic()
+    attempts = 0
+    error: dict[str, str] | None = None
+
+    while attempts < max_attempts:
+        attempts += 1
+        try:
+            result = _invoke_once(client, function_name, shard.event)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code", "Unknown")
+            message = e.response.get("Error", {}).get("Message", str(e))
+            error = {"code": code, "message": message}
+            if code in RETRYABLE_ERROR_CODES and attempts < max_attempts:
+                sleep(backoff_base * (2 ** (attempts - 1)) * (0.5 + random.random()))
+                continue
+            break
+        except BotoCoreError as e:
+            error = {"code": type(e).__name__, "message": str(e)}
+            if isinstance(e, _RETRYABLE_CONNECTION_ERRORS) and attempts < max_attempts:
+                sleep(backoff_base * (2 ** (attempts - 1)) * (0.5 + random.random()))
+                continue
+            break
+        except (RuntimeError, ValueError) as e:
+            error = {"code": "InvokeError", "message": str(e)}
+            break
+
+        duration_ms = int((time.monotonic() - start) * 1000)
+        if "error" in result:
+            return ShardResult(shard.shard_id, False, attempts, duration_ms, error=result["error"])
+        return ShardResult(shard.shard_id, True, attempts, duration_ms, result=result)
+
+    duration_ms = int((time.monotonic() - start) * 1000)
+    return ShardResult(shard.shard_id, False, attempts, duration_ms, error=error)
+
+
+def iter_fanout(
+    client: Any,
+    function_name: str,
+    shards: list[Shard],
+    max_concurrency: int = 8,
+    max_attempts: int = 5,
+    backoff_base: float = 0.5,
+) -> Iterator[ShardResult]:
+    """Invoke shards concurrently and yield results as they complete.
+
+    Args:
+        client: boto3 Lambda client (thread-safe; see lambda_client_config)
+        function_name: Function to invoke
+        shards: Shards to run
+        max_concurrency: Maximum in-flight invocations
+        max_attempts: Maximum invocations per shard including the first
+        backoff_base: Base retry delay in seconds
+
+    Yields:
+        ShardResult per shard, in completion order
+    """
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [
+            executor.submit(
+                invoke_shard, client, function_name, shard, max_attempts, backoff_base
+            )
+            for shard in shards
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def run_fanout(
+    client: Any,
+    function_name: str,
+    shards: list[Shard],
+    max_concurrency: int = 8,
+    max_attempts: int = 5,
+    backoff_base: float = 0.5,
+    on_items: Callable[[ShardResult, Iterable[dict[str, Any]]], None] | None = None,
+    s3_client: Any = None,
+) -> dict[str, Any]:
+    """Run all shards and build a combined manifest.
+
+    Items are handed to on_items as each shard completes, so callers can stream
+    them to a sink instead of holding every shard's items at once. Shards that
+    streamed their items to a sink (items_location) are read back from it.
+
+    Args:
+        client: boto3 Lambda client
+        function_name: Function to invoke
+        shards: Shards to run
+        max_concurrency: Maximum in-flight invocations
+        max_attempts: Maximum invocations per shard including the first
+        backoff_base: Base retry delay in seconds
+        on_items: Callback receiving each successful shard's items
+        s3_client: boto3 S3 client for shards whose items were streamed to S3
+
+    Returns:
+        Manifest with per-shard timing and combined totals
+    """
+    start = time.monotonic()
+    entries = []
+
+    for shard_result in iter_fanout(
+        client, function_name, shards, max_concurrency, max_attempts, backoff_base
+    ):
+        if shard_result.ok and on_items is not None:
+            on_items(shard_result, result_items(shard_result.result, s3_client))
+        entries.append(shard_result.manifest_entry())
+
+    order = {shard.shard_id: i for i, shard in enumerate(shards)}
+    entries.sort(key=lambda e: order[e["shard_id"]])
+    return {
+        "function_name": function_name,
+        "shards": entries,
+        "shard_count": len(entries),
+        "failed_shards": sum(1 for e in entries if e["status"] != "ok"),
+        "total_count": sum(e["count"] for e in entries),
+        "wall_ms": int((time.monotonic() - start) * 1000),
+    }
@@ -0,0 +1,255 @@
+"""Columnar (Parquet) export of scan history for analytics.
+
+Scan results are appended to a hive-partitioned dataset laid out as
+``<root>/date=YYYY-MM-DD/account=<id>/region=<region>/*.parquet``. Tags are
+stored as a ``map<string, string>`` column so queries that only need sizes
+or counts never decode them.
+
+Requires the optional ``pyarrow`` dependency (``pip install saverbot[analytics]``).
+"""
+
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from saverbot.sinks import result_items
+
+PARTITION_FIELDS = ("date", "account", "region")
+
+
+def _pyarrow() -> Any:
+    """Import pyarrow lazily so the Lambda package does not need it."""
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.dataset
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Scan history export requires pyarrow: pip install 'saverbot[analytics]'"
+        ) from e
+    return pyarrow
+
+
+def history_schema() -> Any:
+    """Return the stable schema of the data columns (excluding partitions)."""
+    pa = _pyarrow()
+    return pa.schema(
+        [
+            ("scanned_at", pa.timestamp("us", tz="UTC")),
+            ("service", pa.string()),
+            ("rule", pa.string()),
+            ("volume_id", pa.string()),
+            ("size_gib", pa.int32()),
+            ("create_time", pa.timestamp("us", tz="UTC")),
+            ("tags", pa.map_(pa.string(), pa.string())),
+        ]
+    )
+
+
+def _dataset_schema() -> Any:
+    """Return the history schema with the partition columns appended."""
+    pa = _pyarrow()
+    schema = history_schema()
+    for name in PARTITION_FIELDS:
+        schema = schema.append(pa.field(name, pa.string()))
+    return schema
+
+
+def _partitioning() -> Any:
+    pa = _pyarrow()
+    return pa.dataset.partitioning(
+        pa.schema([(name, pa.string()) for name in PARTITION_FIELDS]), flavor="hive"
+    )
+
+
+def result_to_table(
+    result: dict[str, Any], account_id: str | None = None, s3_client: Any = None
+) -> Any:
+    """Convert one handler result into an Arrow table, one row per item.
+
+    Args:
+        result: Successful handler output (meta/items/count, or items_location
+            for memory-budgeted scans)
+        account_id: Account the scan ran against (default: meta.account_id)
+        s3_client: boto3 S3 client for items streamed to S3
+
+    Returns:
+        pyarrow.Table with the history schema plus partition columns
+    """
+    pa = _pyarrow()
+    meta = result["meta"]
+    account = account_id or meta["account_id"]
+    scanned_at = datetime.fromisoformat(meta["scanned_at"])
+    items = list(result_items(result, s3_client))
+
+    columns: dict[str, list[Any]] = {
+        "scanned_at": [scanned_at] * len(items),
+        "service": [meta["service"]] * len(items),
+        "rule": [meta["rule"]] * len(items),
+        "volume_id": [item["VolumeId"] for item in items],
+        "size_gib": [item["Size"] for item in items],
+        # Volumes known only from attach/detach events have no CreateTime yet
+        "create_time": [
+            datetime.fromisoformat(item["CreateTime"]) if item.get("CreateTime") else None
+            for item in items
+        ],
+        "tags": [list(item["Tags"].items()) for item in items],
+        "date": [scanned_at.date().isoformat()] * len(items),
+        "account": [account] * len(items),
+        "region": [item["Region"] for item in items],
+    }
+    return pa.table(columns, schema=_dataset_schema())
+
+
+def write_scan_result(
+    result: dict[str, Any],
+    root: str | Path,
+    account_id: str | None = None,
+    s3_client: Any = None,
+) -> list[Path]:
+    """Append one handler result to the history dataset.
+
+    Each call writes new files only; existing files are never modified.
+
+    Args:
+        result: Successful handler output (meta/items/count, or items_location
+            for memory-budgeted scans)
+        root: Dataset root directory
+        account_id: Account the scan ran against (default: meta.account_id)
+        s3_client: boto3 S3 client for items streamed to S3
+
+    Returns:
+        Paths of the files written (empty if the result has no items)
+    """
+    pa = _pyarrow()
+    table = result_to_table(result, account_id, s3_client)
+    if table.num_rows == 0:
+        return []
+
+    written: list[Path] = []
+    pa.dataset.write_dataset(
+        table,
+        str(root),
+        format="parquet",
+        partitioning=_partitioning(),
+        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+        file_visitor=lambda f: written.append(Path(f.path)),
+    )
+    return written
+
+
+def _drop_duplicates(table: Any, keys: tuple[str, ...] = ("scanned_at", "volume_id")) -> Any:
+    """Keep the first row for each distinct combination of keys, in table order."""
+    pa = _pyarrow()
+    if table.num_rows == 0:
+        return table
+    # Row numbers 0..n-1, built without a Python-level loop
+    rows = pa.compute.indices_nonzero(pa.repeat(pa.scalar(True), table.num_rows))
+    first = (
+        table.select(list(keys))
+        .append_column("_row", rows)
+        .group_by(list(keys), use_threads=False)
+        .aggregate([("_row", "min")])["_row_min"]
+    )
+    if len(first) == table.num_rows:
+        return table
+    return table.take(first.sort())
+
+
+def compact(root: str | Path, small_file_bytes: int = 8 * 1024 * 1024) -> int:
+    """Merge small files within each partition into a single file.
+
+    The merged file is written under a temporary name and renamed into place
+    before the inputs are removed, so readers never see missing rows. Until the
+    inputs are removed (or permanently, after a crash part-way) rows can be
+    present twice; later compactions drop duplicate (scanned_at, volume_id) rows
+    and orphaned_gib_by_day() counts each volume once per day.
+
+    Args:
+        root: Dataset root directory
+        small_file_bytes: Files at or above this size are left alone
+
+    Returns:
+        Number of partitions compacted
+    """
+    pa = _pyarrow()
+    schema = history_schema()
+    compacted = 0
+
+    partition_dirs = {p.parent for p in Path(root).rglob("*.parquet")}
+    for directory in sorted(partition_dirs):
+        small = sorted(
+            p for p in directory.glob("*.parquet") if p.stat().st_size < small_file_bytes
+        )
+        if len(small) < 2:
+            continue
+
+        table = _drop_duplicates(
+            pa.concat_tables(pa.parquet.read_table(p, schema=schema) for p in small)
+        )
+        tmp_path = directory / f".compact-{uuid.uuid4().hex}.tmp"
+        pa.parquet.write_table(table, tmp_path)
+        tmp_path.rename(directory / f"compacted-{uuid.uuid4().hex}.parquet")
+        for p in small:
+            p.unlink()
+        compacted += 1
+
+    return compacted
+
+
+def read_history(
+    root: str | Path, columns: list[str] | None = None, filter: Any = None
+) -> Any:
+    """Read the history dataset, loading only the requested columns.
+
+    Args:
+        root: Dataset root directory
+        columns: Column names to load (default: all, including partitions)
+        filter: Optional pyarrow.compute expression, e.g.
+            ``pc.field("region") == "us-east-1"``; partition filters skip
+            whole directories
+
+    Returns:
+        pyarrow.Table
+    """
+    pa = _pyarrow()
+    dataset = pa.dataset.dataset(
+        str(root),
+        format="parquet",
+        schema=_dataset_schema(),
+        partitioning=_partitioning(),
+    )
+    return dataset.to_table(columns=columns, filter=filter)
+
+
+def orphaned_gib_by_day(root: str | Path) -> list[dict[str, Any]]:
+    """Summarize unattached EBS GiB and volume count per day and account.
+
+    Each volume counts once per day however many scans saw it (so hourly
+    scans and rows duplicated by an interrupted compaction are not summed),
+    at its largest size that day. Reads only the date, account, volume_id and
+    size_gib columns.
+
+    Returns:
+        Rows of {"date", "account", "size_gib", "volumes"} sorted by date
+    """
+    table = read_history(root, columns=["date", "account", "volume_id", "size_gib"])
+    volumes = table.group_by(["date", "account", "volume_id"], use_threads=False).aggregate(
+        [("size_gib", "max")]
+    )
+    summary = volumes.group_by(["date", "account"], use_threads=False).aggregate(
+        [("size_gib_max", "sum"), ("volume_id", "count")]
+    )
+    rows = [
+        {
+            "date": row["date"],
+            "account": row["account"],
+            "size_gib": row["size_gib_max_sum"],
+            "volumes": row["volume_id_count"],
+        }
+        for row in summary.to_pylist()
+    ]
+    return sorted(rows, key=lambda r: (r["date"], r["account"]))
@@ -1,9 +1,58 @@
 """EC2 unattached EBS volumes scanner."""
 
-from typing import Any
+from collections.abc import Iterator
+from typing import TYPE_CHECKING, Any
 
 import boto3
 
+from saverbot.aws import ec2_client, pagination_config
+
+if TYPE_CHECKING:
+    from mypy_boto3_ec2.type_defs import VolumeTypeDef
+
+# Values allowed in one describe_volumes filter
+_MAX_FILTER_VALUES = 200
+
+
+def volume_item(region: str, volume: "VolumeTypeDef") -> dict[str, Any]:
+    """Convert a describe_volumes volume into a scanner item."""
+    # Convert tags to dict
+    tags = {}
+    for tag in volume.get("Tags", []):
+        tags[tag["Key"]] = tag["Value"]
+
+    return {
+        "Region": region,
+        "VolumeId": volume["VolumeId"],
+        "Size": volume["Size"],
+        "SnapshotId": volume.get("SnapshotId") or None,
+        "CreateTime": volume["CreateTime"].isoformat(),
+        "Tags": tags,
+    }
+
+
+def iter_unattached_volume_pages(
+    session: boto3.Session, region: str
+) -> Iterator[list[dict[str, Any]]]:
+    """Yield unattached EBS volumes in a region one API page at a time.
+
+    Args:
+        session: Authenticated boto3 session
+        region: AWS region to scan
+
+    Yields:
+        Lists of unattached volumes with metadata
+    """
+    client = ec2_client(session, region)
+
+    # Describe all volumes with filter for available (unattached) state
+    paginator = client.get_paginator("describe_volumes")
+    for page in paginator.paginate(
+        Filters=[{"Name": "status", "Values": ["available"]}],
+        PaginationConfig=pagination_config(),
+    ):
+        yield [volume_item(region, volume) for volume in page.get("Volumes", [])]
+
 
 def list_unattached_volumes(session: boto3.Session, region: str) -> list[dict[str, Any]]:
     """List all unattached EBS volumes in a region.
@@ -15,27 +64,39 @@ def list_unattached_volumes(session: boto3.Session, region: str) -> list[dict[st
     Returns:
         List of unattached volumes with metadata
     """
-    ec2_client = session.client("ec2", region_name=region)
+    volumes = []
+    for page in iter_unattached_volume_pages(session, region):
+        volumes.extend(page)
+    return volumes
 
-    # Describe all volumes with filter for available (unattached) state
-    response = ec2_client.describe_volumes(
-        Filters=[{"Name": "status", "Values": ["available"]}]
-    )
 
-    volumes = []
-    for volume in response.get("Volumes", []):
-        # Convert tags to dict
-        tags = {}
-        for tag in volume.get("Tags", []):
-            tags[tag["Key"]] = tag["Value"]
-
-        volumes.append({
-            "Region": region,
-            "VolumeId": volume["VolumeId"],
-            "Size": volume["Size"],
-            "CreateTime": volume["CreateTime"].isoformat(),
-            "Tags": tags,
-        })
+def describe_volumes_by_id(
+    session: boto3.Session, region: str, volume_ids: list[str]
+) -> list[dict[str, Any]]:
+    """Describe specific EBS volumes, whatever their state.
 
-    return volumes
+    Volumes that no longer exist are left out rather than failing the call.
+    Unlike scanner items, each item also has the volume's EC2 State.
 
+    Args:
+        session: Authenticated boto3 session
+        region: AWS region of the volumes
+        volume_ids: Volume IDs to describe
+
+    Returns:
+        Scanner items plus State for the volumes that exist
+    """
+    client = ec2_client(session, region)
+    paginator = client.get_paginator("describe_volumes")
+    volumes: list[dict[str, Any]] = []
+    for start in range(0, len(volume_ids), _MAX_FILTER_VALUES):
+        chunk = volume_ids[start : start + _MAX_FILTER_VALUES]
+        for page in paginator.paginate(
+            Filters=[{"Name": "volume-id", "Values": chunk}],
+            PaginationConfig=pagination_config(),
+        ):
+            volumes.extend(
+                {**volume_item(region, volume), "State": volume["State"]}
+                for volume in page.get("Volumes", [])
+            )
+    return volumes
@@ -0,0 +1,143 @@
+"""Snapshot and AMI cross-reference index for unattached volumes."""
+
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import boto3
+
+from saverbot.aws import ec2_client, pagination_config
+
+
+@dataclass
+class SnapshotIndex:
+    """Hash indexes over a region's self-owned completed snapshots and AMIs."""
+
+    region: str
+    built_at: float
+    # volume-id -> [(snapshot-id, start time)]
+    snapshots_by_volume: dict[str, list[tuple[str, datetime]]] = field(default_factory=dict)
+    # snapshot-id -> [ami-id]
+    amis_by_snapshot: dict[str, list[str]] = field(default_factory=dict)
+
+
+def build_snapshot_index(session: boto3.Session, region: str) -> SnapshotIndex:
+    """Build the index with paginated bulk describe calls.
+
+    Only completed snapshots are indexed, so pending or failed ones never count
+    as a recent backup.
+
+    Args:
+        session: Authenticated boto3 session
+        region: AWS region to index
+
+    Returns:
+        SnapshotIndex for the region
+    """
+    client = ec2_client(session, region)
+    pagination = pagination_config()
+    index = SnapshotIndex(region=region, built_at=time.time())
+
+    for snapshot_page in client.get_paginator("describe_snapshots").paginate(
+        OwnerIds=["self"], PaginationConfig=pagination
+    ):
+        for snapshot in snapshot_page.get("Snapshots", []):
+            # A pending or failed snapshot is not a usable backup
+            if snapshot.get("State") != "completed":
+                continue
+            index.snapshots_by_volume.setdefault(snapshot["VolumeId"], []).append(
+                (snapshot["SnapshotId"], snapshot["StartTime"])
+            )
+
+    for image_page in client.get_paginator("describe_images").paginate(
+        Owners=["self"], PaginationConfig=pagination
+    ):
+        for image in image_page.get("Images", []):
+            for mapping in image.get("BlockDeviceMappings", []):
+                snapshot_id = mapping.get("Ebs", {}).get("SnapshotId")
+                if snapshot_id:
+                    index.amis_by_snapshot.setdefault(snapshot_id, []).append(image["ImageId"])
+
+    return index
+
+
+_index_cache: dict[tuple[str, str], SnapshotIndex] = {}
+_index_lock = threading.Lock()
+
+
+def get_snapshot_index(
+    session: boto3.Session,
+    region: str,
+    account_id: str,
+    ttl_seconds: float,
+    clock: Callable[[], float] = time.time,
+) -> SnapshotIndex:
+    """Return the index for (account, region), reusing it across warm invocations.
+
+    Args:
+        session: Authenticated boto3 session for the account
+        region: AWS region to index
+        account_id: Account the session belongs to (cache key)
+        ttl_seconds: Maximum age of a cached index
+        clock: Time source, in seconds since the epoch
+
+    Returns:
+        SnapshotIndex for the region
+    """
+    key = (account_id, region)
+    with _index_lock:
+        index = _index_cache.get(key)
+    if index is not None and clock() - index.built_at <= ttl_seconds:
+        return index
+
+    index = build_snapshot_index(session, region)
+    index.built_at = clock()
+    with _index_lock:
+        _index_cache[key] = index
+    return index
+
+
+def clear_snapshot_index_cache() -> None:
+    """Drop all cached indexes."""
+    with _index_lock:
+        _index_cache.clear()
+
+
+def annotate_volumes(
+    volumes: list[dict[str, Any]],
+    index: SnapshotIndex,
+    recent_days: int = 30,
+    now: datetime | None = None,
+) -> None:
+    """Add backup information to scanner items in place.
+
+    Adds SnapshotCount, LatestSnapshotTime, AmiIds (AMIs built from the
+    volume's snapshots or its source snapshot) and SafeToDelete, which is true
+    when the volume has a completed snapshot newer than recent_days or was
+    created from an AMI's snapshot.
+
+    Args:
+        volumes: Items from list_unattached_volumes for index.region
+        index: SnapshotIndex for the same region
+        recent_days: Age limit for a snapshot to count as recent
+        now: Reference time (default: current UTC time)
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=recent_days)
+
+    for volume in volumes:
+        snapshots = index.snapshots_by_volume.get(volume["VolumeId"], [])
+        latest = max((start for _, start in snapshots), default=None)
+
+        ami_ids: set[str] = set()
+        for snapshot_id, _ in snapshots:
+            ami_ids.update(index.amis_by_snapshot.get(snapshot_id, []))
+        source_amis = index.amis_by_snapshot.get(volume.get("SnapshotId") or "", [])
+        ami_ids.update(source_amis)
+
+        volume["SnapshotCount"] = len(snapshots)
+        volume["LatestSnapshotTime"] = latest.isoformat() if latest else None
+        volume["AmiIds"] = sorted(ami_ids)
+        volume["SafeToDelete"] = bool(source_amis) or (latest is not None and latest >= cutoff)
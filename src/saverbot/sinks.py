@@ -0,0 +1,160 @@
+"""Streaming NDJSON sinks for scan items too large to return inline."""
+
+import json
+import uuid
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any, Protocol
+
+import boto3
+from boto3.s3.transfer import TransferConfig
+
+
+class ItemSink(Protocol):
+    """Destination that items are written to one at a time."""
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Append one record."""
+        ...
+
+    def close(self) -> dict[str, Any]:
+        """Finish writing and return where the items can be read from."""
+        ...
+
+    def abort(self) -> None:
+        """Discard anything written so far."""
+        ...
+
+
+class FileSink:
+    """NDJSON file under a directory, one file per scan."""
+
+    def __init__(self, directory: str | Path) -> None:
+        """Initialize FileSink.
+
+        Args:
+            directory: Directory for result files (created if missing)
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f"scan-{uuid.uuid4().hex}.ndjson"
+        self._file = open(self.path, "wb")
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Append one record."""
+        self._file.write(json.dumps(record, separators=(",", ":")).encode("utf-8"))
+        self._file.write(b"\n")
+
+    def close(self) -> dict[str, Any]:
+        """Finish writing and return {"type": "file", "format", "path"}."""
+        self._file.close()
+        return {"type": "file", "format": "ndjson", "path": str(self.path)}
+
+    def abort(self) -> None:
+        """Close and delete the file."""
+        self._file.close()
+        self.path.unlink(missing_ok=True)
+
+
+class S3Sink:
+    """NDJSON object in S3, staged in a local file and uploaded on close."""
+
+    def __init__(self, client: Any, bucket: str, key: str, staging_dir: str | Path) -> None:
+        """Initialize S3Sink.
+
+        Args:
+            client: boto3 S3 client
+            bucket: Destination bucket
+            key: Destination object key
+            staging_dir: Local directory for the file being uploaded
+        """
+        self.client = client
+        self.bucket = bucket
+        self.key = key
+        self._staged = FileSink(staging_dir)
+
+    def write(self, record: dict[str, Any]) -> None:
+        """Append one record."""
+        self._staged.write(record)
+
+    def close(self) -> dict[str, Any]:
+        """Upload the staged file and return {"type": "s3", "format", "bucket", "key"}."""
+        staged = self._staged.close()
+        try:
+            # Sequential multipart upload reads the file a chunk at a time
+            self.client.upload_file(
+                staged["path"],
+                self.bucket,
+                self.key,
+                ExtraArgs={"ContentType": "application/x-ndjson"},
+                Config=TransferConfig(use_threads=False),
+            )
+        finally:
+            Path(staged["path"]).unlink(missing_ok=True)
+        return {"type": "s3", "format": "ndjson", "bucket": self.bucket, "key": self.key}
+
+    def abort(self) -> None:
+        """Discard the staged file."""
+        self._staged.abort()
+
+
+def write_items(records: Iterable[dict[str, Any]], sink: ItemSink) -> tuple[dict[str, Any], int]:
+    """Stream records into a sink.
+
+    Returns:
+        Tuple of (location from sink.close(), number of records written)
+    """
+    count = 0
+    try:
+        for record in records:
+            sink.write(record)
+            count += 1
+    except BaseException:
+        sink.abort()
+        raise
+    return sink.close(), count
+
+
+def read_items(location: dict[str, Any], s3_client: Any = None) -> Iterator[dict[str, Any]]:
+    """Stream the items a sink wrote, one record at a time.
+
+    Args:
+        location: Location returned by the sink (a result's items_location)
+        s3_client: boto3 S3 client for "s3" locations (default: a new client)
+
+    Yields:
+        Item records in the order they were written
+
+    Raises:
+        ValueError: If the location type is unknown
+    """
+    if location["type"] == "file":
+        # Only readable where the scan ran (e.g. not a remote Lambda's /tmp)
+        with open(location["path"], encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    elif location["type"] == "s3":
+        client = s3_client or boto3.client("s3")
+        body = client.get_object(Bucket=location["bucket"], Key=location["key"])["Body"]
+        for raw in body.iter_lines():
+            if raw.strip():
+                yield json.loads(raw)
+    else:
+        raise ValueError(f"Unknown items location type: {location['type']!r}")
+
+
+def result_items(result: dict[str, Any], s3_client: Any = None) -> Iterable[dict[str, Any]]:
+    """Return a handler result's items, whether inline or streamed to a sink.
+
+    Args:
+        result: Successful handler output (items, or items_location)
+        s3_client: boto3 S3 client for results streamed to S3
+
+    Returns:
+        The inline items list, or an iterator reading items_location
+    """
+    if "items_location" in result:
+        return read_items(result["items_location"], s3_client)
+    items: list[dict[str, Any]] = result["items"]
+    return items
@@ -0,0 +1,162 @@
+"""Memory-bounded record buffering with spill-to-disk."""
+
+import heapq
+import json
+import shutil
+import tempfile
+from collections.abc import Callable, Iterator
+from pathlib import Path
+from types import TracebackType
+from typing import IO, Any
+
+# Rough per-record cost of the tuple and bytes objects held alongside the JSON
+_RECORD_OVERHEAD_BYTES = 120
+
+# Runs merged at once; bounds the files (and read buffers) open while merging
+_MERGE_FANIN = 16
+
+
+class SpillBuffer:
+    """Collect records in sorted order, spilling runs to NDJSON files past a budget.
+
+    Records are held as compact JSON lines rather than dicts. Once their
+    approximate size exceeds the budget, the buffer is sorted and written to a
+    run file. Every _MERGE_FANIN runs of one size are merged into a larger run,
+    and iteration merge-streams the remaining runs with the in-memory
+    remainder, so peak memory is bounded by the budget rather than the number
+    of records.
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        key: Callable[[dict[str, Any]], Any],
+        directory: str | Path | None = None,
+    ) -> None:
+        """Initialize SpillBuffer.
+
+        Args:
+            budget_bytes: Approximate in-memory budget (0 disables spilling)
+            key: Sort key for records
+            directory: Parent directory for run files (default: system temp dir)
+        """
+        self.budget_bytes = budget_bytes
+        self.key = key
+        self.directory = directory
+        self.count = 0
+        self._buffer: list[tuple[Any, int, bytes]] = []
+        self._buffered_bytes = 0
+        self._seq = 0
+        # (merge level, path); levels never increase along the list
+        self._runs: list[tuple[int, Path]] = []
+        self._runs_written = 0
+        self._files_created = 0
+        self._run_dir: Path | None = None
+
+    @property
+    def spilled_runs(self) -> int:
+        """Number of buffer spills so far."""
+        return self._runs_written
+
+    def add(self, record: dict[str, Any]) -> None:
+        """Add one record, spilling the buffer if the budget is exceeded."""
+        line = json.dumps(record, separators=(",", ":")).encode("utf-8")
+        # The sequence number keeps equal keys in insertion order
+        self._buffer.append((self.key(record), self._seq, line))
+        self._seq += 1
+        self._buffered_bytes += len(line) + _RECORD_OVERHEAD_BYTES
+        self.count += 1
+        if self.budget_bytes and self._buffered_bytes > self.budget_bytes:
+            self._spill()
+
+    def extend(self, records: list[dict[str, Any]]) -> None:
+        """Add several records."""
+        for record in records:
+            self.add(record)
+
+    def _new_run_path(self) -> Path:
+        if self._run_dir is None:
+            self._run_dir = Path(tempfile.mkdtemp(prefix="saverbot-spill-", dir=self.directory))
+        self._files_created += 1
+        return self._run_dir / f"run-{self._files_created:05d}.ndjson"
+
+    def _spill(self) -> None:
+        self._buffer.sort()
+        path = self._new_run_path()
+        with open(path, "wb") as f:
+            for _, seq, line in self._buffer:
+                f.write(b"%d " % seq)
+                f.write(line)
+                f.write(b"\n")
+        self._runs.append((0, path))
+        self._runs_written += 1
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._merge_runs()
+
+    def _merge_runs(self) -> None:
+        """Merge the trailing runs while _MERGE_FANIN of them share a level."""
+        while len(self._runs) >= _MERGE_FANIN:
+            tail = self._runs[-_MERGE_FANIN:]
+            level = tail[0][0]
+            if any(run_level != level for run_level, _ in tail):
+                return
+            path = self._new_run_path()
+            files = [open(run_path, "rb") for _, run_path in tail]
+            try:
+                with open(path, "wb") as out:
+                    for raw in heapq.merge(*files, key=self._raw_sort_key):
+                        out.write(raw)
+            finally:
+                for f in files:
+                    f.close()
+            for _, run_path in tail:
+                run_path.unlink()
+            self._runs[-_MERGE_FANIN:] = [(level + 1, path)]
+
+    def _raw_sort_key(self, raw: bytes) -> tuple[Any, int]:
+        seq, line = raw.split(b" ", 1)
+        return self.key(json.loads(line)), int(seq)
+
+    def _read_run(self, f: IO[bytes]) -> Iterator[tuple[Any, int, dict[str, Any]]]:
+        for raw in f:
+            seq, line = raw.split(b" ", 1)
+            record = json.loads(line)
+            yield self.key(record), int(seq), record
+
+    def _read_buffer(self) -> Iterator[tuple[Any, int, dict[str, Any]]]:
+        for key, seq, line in self._buffer:
+            yield key, seq, json.loads(line)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        """Yield all records in key order, merge-streaming spilled runs."""
+        self._buffer.sort()
+        files = [open(path, "rb") for _, path in self._runs]
+        try:
+            streams = [self._read_run(f) for f in files]
+            # Sequence numbers are unique, so records themselves are never compared
+            for _, _, record in heapq.merge(*streams, self._read_buffer()):
+                yield record
+        finally:
+            for f in files:
+                f.close()
+
+    def close(self) -> None:
+        """Discard buffered records and delete run files."""
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._runs = []
+        if self._run_dir is not None:
+            shutil.rmtree(self._run_dir, ignore_errors=True)
+            self._run_dir = None
+
+    def __enter__(self) -> "SpillBuffer":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        self.close()
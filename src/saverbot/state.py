@@ -0,0 +1,229 @@
+"""Persisted per-region volume state for event-driven updates."""
+
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Protocol
+
+from botocore.exceptions import ClientError
+
+from saverbot.errors import StateConflictError
+
+# Scanner item fields kept for each volume
+ITEM_FIELDS = ("Region", "VolumeId", "Size", "SnapshotId", "CreateTime", "Tags")
+
+
+@dataclass
+class RegionState:
+    """Known volumes of one (account, region).
+
+    Each volume entry holds the scanner item fields plus State ("available",
+    "in-use", "deleted", or another EC2 volume state such as "error" when it
+    was described) and UpdatedAt (ISO time of the last applied change).
+    Entries first seen through an attach or detach event have no details yet
+    and carry Partial: True until they are described.
+    """
+
+    account_id: str
+    region: str
+    reconciled_at: str | None = None
+    volumes: dict[str, dict[str, Any]] = field(default_factory=dict)
+    # Backend token for optimistic concurrency (None: not stored yet)
+    version: str | None = None
+
+    def unattached_items(self) -> list[dict[str, Any]]:
+        """Return scanner-shaped items for volumes currently available."""
+        return [
+            {name: entry.get(name) for name in ITEM_FIELDS}
+            for entry in self.volumes.values()
+            if entry["State"] == "available"
+        ]
+
+    def partial_volume_ids(self) -> list[str]:
+        """Return IDs of available volumes whose details are not known yet."""
+        return [
+            volume_id
+            for volume_id, entry in self.volumes.items()
+            if entry["State"] == "available" and entry.get("Partial")
+        ]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Serialize without the version token."""
+        return {
+            "account_id": self.account_id,
+            "region": self.region,
+            "reconciled_at": self.reconciled_at,
+            "volumes": self.volumes,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], version: str | None) -> "RegionState":
+        """Deserialize a stored state."""
+        return cls(
+            account_id=data["account_id"],
+            region=data["region"],
+            reconciled_at=data.get("reconciled_at"),
+            volumes=data.get("volumes", {}),
+            version=version,
+        )
+
+
+class VolumeStateStore(Protocol):
+    """Storage for RegionState documents."""
+
+    def load(self, account_id: str, region: str) -> RegionState:
+        """Return the stored state, or an empty one if none exists."""
+        ...
+
+    def save(self, state: RegionState) -> None:
+        """Store state if unchanged since it was loaded.
+
+        Raises:
+            StateConflictError: If another writer saved in the meantime
+        """
+        ...
+
+
+class FileStateStore:
+    """JSON-file store, one file per account and region.
+
+    Conflict detection only covers writers within this process.
+    """
+
+    def __init__(self, directory: str | Path) -> None:
+        """Initialize FileStateStore.
+
+        Args:
+            directory: Root directory for state files (created if missing)
+        """
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def _path(self, account_id: str, region: str) -> Path:
+        return self.directory / account_id / f"{region}.json"
+
+    @staticmethod
+    def _version(path: Path) -> str | None:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return None
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def load(self, account_id: str, region: str) -> RegionState:
+        """Return the stored state, or an empty one if none exists."""
+        path = self._path(account_id, region)
+        with self._lock:
+            version = self._version(path)
+            if version is None:
+                return RegionState(account_id=account_id, region=region)
+            with open(path, encoding="utf-8") as f:
+                return RegionState.from_dict(json.load(f), version)
+
+    def save(self, state: RegionState) -> None:
+        """Store state if unchanged since it was loaded."""
+        path = self._path(state.account_id, state.region)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            if self._version(path) != state.version:
+                raise StateConflictError(state.account_id, state.region)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(state.to_dict(), f, separators=(",", ":"))
+                os.replace(tmp_path, path)
+            except BaseException:
+                Path(tmp_path).unlink(missing_ok=True)
+                raise
+            state.version = self._version(path)
+
+
+class S3StateStore:
+    """S3 store using conditional writes (If-Match / If-None-Match) on the object ETag."""
+
+    def __init__(self, client: Any, bucket: str, prefix: str = "volume-state/") -> None:
+        """Initialize S3StateStore.
+
+        Args:
+            client: boto3 S3 client
+            bucket: Bucket holding state objects
+            prefix: Key prefix for state objects
+        """
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, account_id: str, region: str) -> str:
+        return f"{self.prefix}{account_id}/{region}.json"
+
+    def load(self, account_id: str, region: str) -> RegionState:
+        """Return the stored state, or an empty one if none exists."""
+        try:
+            response = self.client.get_object(
+                Bucket=self.bucket, Key=self._key(account_id, region)
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+                return RegionState(account_id=account_id, region=region)
+            raise
+        data = json.loads(response["Body"].read())
+        return RegionState.from_dict(data, response["ETag"])
+
+    def save(self, state: RegionState) -> None:
+        """Store state if unchanged since it was loaded."""
+        condition = {"IfMatch": state.version} if state.version else {"IfNoneMatch": "*"}
+        try:
+            response = self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(state.account_id, state.region),
+                Body=json.dumps(state.to_dict(), separators=(",", ":")).encode("utf-8"),
+                ContentType="application/json",
+                **condition,
+            )
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code in ("PreconditionFailed", "ConditionalRequestConflict"):
+                raise StateConflictError(state.account_id, state.region) from e
+            raise
+        state.version = response["ETag"]
+
+
+def update_region(
+    store: VolumeStateStore,
+    account_id: str,
+    region: str,
+    mutate: Callable[[RegionState], bool],
+    max_attempts: int = 5,
+) -> RegionState:
+    """Load, mutate and save a region's state, retrying on write conflicts.
+
+    Args:
+        store: State store
+        account_id: Account ID
+        region: AWS region
+        mutate: Function applying changes to the loaded state in place and
+            returning whether anything changed (unchanged state is not saved)
+        max_attempts: Maximum load/mutate/save rounds
+
+    Returns:
+        The saved (or unchanged) state
+
+    Raises:
+        StateConflictError: If every attempt conflicted
+    """
+    attempts = 0
+    while True:
+        attempts += 1
+        state = store.load(account_id, region)
+        if not mutate(state):
+            return state
+        try:
+            store.save(state)
+            return state
+        except StateConflictError:
+            if attempts >= max_attempts:
+                raise
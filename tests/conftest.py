@@ -0,0 +1,46 @@
+"""Shared pytest fixtures."""
+
+import os
+from collections.abc import Callable, Iterator
+
+import pytest
+
+from saverbot.config import reload_config
+
+
+@pytest.fixture(autouse=True)
+def _fresh_config() -> Iterator[None]:
+    """Give each test a freshly loaded Config.
+
+    The handler rebuilds its result cache and state store whenever the Config
+    instance changes, so each test also starts with empty singletons instead
+    of sharing a process-wide 300 s cache.
+    """
+    reload_config()
+    yield
+    reload_config()
+
+
+@pytest.fixture
+def saver_env() -> Iterator[Callable[..., None]]:
+    """Set SAVER_* environment variables and reload the cached config.
+
+    The previous environment and config are restored afterwards.
+    """
+    saved: dict[str, str | None] = {}
+
+    def set_env(**values: object) -> None:
+        for name, value in values.items():
+            key = f"SAVER_{name.upper()}"
+            saved.setdefault(key, os.environ.get(key))
+            os.environ[key] = str(value)
+        reload_config()
+
+    yield set_env
+
+    for key, old in saved.items():
+        if old is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = old
+    reload_config()
@@ -0,0 +1,318 @@
+"""Performance regression harness.
+
+Runs deterministic offline scenarios and compares API calls, peak allocations,
+wall time and payload size against tests/fixtures/bench_baseline.json. Run with
+`make bench`; `make bench_baseline` (BENCH_UPDATE=1) rewrites the baseline.
+
+Wall time is gated as a ratio to a fixed calibration workload timed in the same
+process, so a baseline recorded on one machine holds on another. Allocations
+include moto's own, so the baseline records the (pinned) moto version it was
+measured with.
+"""
+
+import gc
+import json
+import math
+import os
+import statistics
+import time
+import tracemalloc
+from collections import Counter
+from collections.abc import Callable, Iterator
+from dataclasses import asdict, dataclass, field
+from importlib.metadata import version
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler
+from saverbot.scanners.ec2_unattached import list_unattached_volumes
+from saverbot.scanners.snapshot_index import clear_snapshot_index_cache
+
+pytestmark = pytest.mark.perf
+
+BASELINE = Path(__file__).parent / "fixtures" / "bench_baseline.json"
+UPDATE = os.environ.get("BENCH_UPDATE") == "1"
+ROLE_ARN = "arn:aws:iam::123456789012:role/bench"
+# Untraced scenario runs timed, each followed by the best of a few calibration runs
+WALL_ROUNDS = 7
+CALIBRATION_RUNS = 3
+
+# Allowed growth over the baseline, as a fraction of the baseline value
+DEFAULT_TOLERANCES = {
+    "api_calls": 0.0,
+    "payload_bytes": 0.0,
+    "peak_alloc_bytes": 0.25,
+    "wall_relative": 0.5,
+}
+# Absolute growth always allowed, so near-zero baselines are not flaky
+DEFAULT_SLACK = {
+    "api_calls": 0,
+    "payload_bytes": 0,
+    "peak_alloc_bytes": 64 * 1024,
+    "wall_relative": 1.0,
+}
+
+
+@dataclass
+class Metrics:
+    """Measurements for one scenario run."""
+
+    api_calls: int
+    peak_alloc_bytes: int
+    wall_relative: float  # median wall time / calibration time
+    payload_bytes: int
+    wall_ms: float  # fastest run; informational only, depends on the machine
+    calls_by_operation: dict[str, int] = field(default_factory=dict)
+
+
+def payload_bytes(result: Any) -> int:
+    """Return the serialized size of a result, ignoring run-dependent meta values."""
+    if isinstance(result, dict) and "meta" in result:
+        meta = dict(result["meta"])
+        for name in ("scanned_at", "duration_ms", "cache_age_seconds"):
+            if name in meta:
+                meta[name] = None
+        result = {**result, "meta": meta}
+    return len(json.dumps(result, separators=(",", ":"), default=str).encode("utf-8"))
+
+
+def _timed(run: Callable[[], Any]) -> float:
+    """Return the wall time of one run, in seconds."""
+    start = time.perf_counter()
+    run()
+    return time.perf_counter() - start
+
+
+def _calibration_workload() -> Callable[[], Any]:
+    """Return a fixed serialization workload, the unit for wall_relative."""
+    data = [
+        {"VolumeId": f"vol-{i:017x}", "Size": i, "Tags": {"Name": f"bench-{i}"}}
+        for i in range(5000)
+    ]
+    return lambda: json.loads(json.dumps(data))
+
+
+def wall_time(run: Callable[[], Any], rounds: int = WALL_ROUNDS) -> tuple[float, float]:
+    """Time untraced runs against the calibration workload.
+
+    Each round times the scenario and then the calibration (best of a few),
+    so both see the same machine load; the median ratio across rounds is
+    kept. Like timeit, the cyclic GC is off while timing: its cost grows with
+    every object left on the heap by earlier tests, not with the code timed.
+
+    Returns:
+        Tuple of (median scenario/calibration ratio, fastest run in seconds)
+    """
+    calibrate = _calibration_workload()
+    ratios = []
+    fastest = math.inf
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(rounds):
+            wall = _timed(run)
+            unit = min(_timed(calibrate) for _ in range(CALIBRATION_RUNS))
+            ratios.append(wall / unit)
+            fastest = min(fastest, wall)
+    finally:
+        gc.enable()
+    return statistics.median(ratios), fastest
+
+
+def measure(session: boto3.Session, run: Callable[[], Any]) -> Metrics:
+    """Run a scenario and measure warm runs.
+
+    The first run loads botocore service models and moto templates, which are
+    one-off per-process costs. API calls are counted through session's clients
+    and allocations traced in one run; wall time is taken from separate
+    untraced runs, since tracemalloc slows the code several times over.
+    """
+    run()
+    calls: Counter[str] = Counter()
+
+    def count_call(model: Any, **kwargs: Any) -> None:
+        calls[model.name] += 1
+
+    session.events.register("before-call", count_call)
+    # Start from empty GC generations so the peak does not depend on earlier tests
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        session.events.unregister("before-call", count_call)
+
+    ratio, wall = wall_time(run)
+    return Metrics(
+        api_calls=sum(calls.values()),
+        peak_alloc_bytes=peak,
+        wall_relative=round(ratio, 2),
+        payload_bytes=payload_bytes(result),
+        wall_ms=round(wall * 1000, 1),
+        calls_by_operation=dict(sorted(calls.items())),
+    )
+
+
+def create_volumes(region: str, count: int, with_snapshots: bool = False) -> None:
+    """Create count tagged, unattached volumes in region."""
+    ec2 = boto3.client("ec2", region_name=region)
+    for i in range(count):
+        volume_id = ec2.create_volume(
+            Size=1 + i % 50,
+            AvailabilityZone=f"{region}a",
+            TagSpecifications=[
+                {
+                    "ResourceType": "volume",
+                    "Tags": [
+                        {"Key": "Name", "Value": f"bench-{i:04d}"},
+                        {"Key": "team", "Value": f"team-{i % 7}"},
+                    ],
+                }
+            ],
+        )["VolumeId"]
+        if with_snapshots and i % 3 == 0:
+            ec2.create_snapshot(VolumeId=volume_id)
+
+
+def scan_event(regions: list[str], **extra: Any) -> dict[str, Any]:
+    """Build a handler event for the bench role."""
+    return {"role_arn": ROLE_ARN, "external_id": "bench-external-id", "regions": regions, **extra}
+
+
+def scenario_list_single_region(session: boto3.Session) -> Callable[[], Any]:
+    """list_unattached_volumes over 300 volumes in one region."""
+    create_volumes("us-east-1", 300)
+    return lambda: list_unattached_volumes(session, "us-east-1")
+
+
+def scenario_handler_multi_region(session: boto3.Session) -> Callable[[], Any]:
+    """handler() across three regions of 100 volumes each."""
+    regions = ["us-east-1", "us-west-2", "eu-west-1"]
+    for region in regions:
+        create_volumes(region, 100)
+    return lambda: handler(scan_event(regions), None)
+
+
+def scenario_handler_annotated(session: boto3.Session) -> Callable[[], Any]:
+    """handler() with snapshot annotations across two regions."""
+    regions = ["us-east-1", "eu-west-1"]
+    for region in regions:
+        create_volumes(region, 60, with_snapshots=True)
+
+    def run() -> Any:
+        # Rebuild the snapshot index each run rather than reading it warm
+        clear_snapshot_index_cache()
+        return handler(scan_event(regions, annotate_snapshots=True), None)
+
+    return run
+
+
+def scenario_handler_cache_hit(session: boto3.Session) -> Callable[[], Any]:
+    """Repeated handler() call served from the result cache."""
+    create_volumes("us-east-1", 100)
+    event = scan_event(["us-east-1"])
+    return lambda: handler(event, None)
+
+
+def scenario_handler_from_state(session: boto3.Session) -> Callable[[], Any]:
+    """handler() with source "state" after a reconciling scan."""
+    regions = ["us-east-1", "us-west-2"]
+    for region in regions:
+        create_volumes(region, 100)
+    handler(scan_event(regions), None)
+    return lambda: handler(scan_event(regions, source="state"), None)
+
+
+SCENARIOS = {
+    "list_single_region": scenario_list_single_region,
+    "handler_multi_region": scenario_handler_multi_region,
+    "handler_annotated": scenario_handler_annotated,
+    "handler_cache_hit": scenario_handler_cache_hit,
+    "handler_from_state": scenario_handler_from_state,
+}
+# Config overrides per scenario (others run with the result cache disabled)
+SCENARIO_SETTINGS: dict[str, dict[str, Any]] = {
+    "handler_cache_hit": {"cache_ttl_seconds": 300},
+}
+
+
+def load_baseline() -> dict[str, Any]:
+    """Load the stored baseline, or an empty one."""
+    if not BASELINE.exists():
+        return {"tolerances": DEFAULT_TOLERANCES, "slack": DEFAULT_SLACK, "scenarios": {}}
+    with open(BASELINE, encoding="utf-8") as f:
+        data: dict[str, Any] = json.load(f)
+    return data
+
+
+def regressions(
+    metrics: Metrics,
+    expected: dict[str, Any],
+    tolerances: dict[str, float],
+    slack: dict[str, float],
+) -> list[str]:
+    """Describe every metric that grew beyond its tolerance and slack."""
+    problems = []
+    for name, tolerance in tolerances.items():
+        current = getattr(metrics, name)
+        limit = max(expected[name] * (1 + tolerance), expected[name] + slack.get(name, 0))
+        if current > limit:
+            problems.append(f"{name}: {current} > baseline {expected[name]} (limit {limit:g})")
+    return problems
+
+
+@pytest.fixture
+def bench_session(
+    name: str, tmp_path: Path, saver_env: Callable[..., None]
+) -> Iterator[boto3.Session]:
+    """Provide a mocked AWS session used by handler() in place of assume()."""
+    settings: dict[str, Any] = {
+        "scan_max_workers": 1,
+        "cache_ttl_seconds": 0,
+        "state_backend": "file",
+        "state_dir": tmp_path,
+    }
+    saver_env(**{**settings, **SCENARIO_SETTINGS.get(name, {})})
+    clear_snapshot_index_cache()
+    with mock_aws():
+        session = boto3.Session(region_name="us-east-1")
+        with patch("lambdas.scan_ec2_unattached_ebs.handler.assume", return_value=session):
+            yield session
+    clear_snapshot_index_cache()
+
+
+@pytest.mark.parametrize("name", sorted(SCENARIOS))
+def test_bench(name: str, bench_session: boto3.Session) -> None:
+    """Test a scenario does not regress against the stored baseline."""
+    run = SCENARIOS[name](bench_session)
+    metrics = measure(bench_session, run)
+    baseline = load_baseline()
+
+    if UPDATE:
+        baseline["tolerances"] = DEFAULT_TOLERANCES
+        baseline["slack"] = DEFAULT_SLACK
+        baseline["moto_version"] = version("moto")
+        baseline.setdefault("scenarios", {})[name] = asdict(metrics)
+        baseline["scenarios"] = dict(sorted(baseline["scenarios"].items()))
+        with open(BASELINE, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        return
+
+    expected = baseline["scenarios"].get(name)
+    if expected is None:
+        pytest.fail(f"No baseline for {name}; run `make bench_baseline`")
+    if baseline.get("moto_version") != version("moto"):
+        pytest.fail(
+            f"Baseline was recorded with moto {baseline.get('moto_version')}, "
+            f"installed {version('moto')}; run `make bench_baseline`"
+        )
+    problems = regressions(metrics, expected, baseline["tolerances"], baseline["slack"])
+    assert not problems, f"{name} regressed:\n" + "\n".join(problems)
@@ -0,0 +1,258 @@
+"""Tests for the scan result cache."""
+
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler
+from saverbot.cache import DiskBackend, MemoryBackend, ResultCache, cache_key
+
+
+class FakeClock:
+    """Manually advanced clock."""
+
+    def __init__(self) -> None:
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_cache_key_is_order_independent() -> None:
+    """Test that key ordering does not change the hash."""
+    assert cache_key({"a": 1, "b": [1, 2]}) == cache_key({"b": [1, 2], "a": 1})
+    assert cache_key({"a": 1}) != cache_key({"a": 2})
+
+
+def test_result_cache_hit_and_expiry() -> None:
+    """Test that results are reused within the TTL and recomputed after it."""
+    clock = FakeClock()
+    cache = ResultCache(MemoryBackend(), ttl_seconds=60, clock=clock)
+    calls = []
+
+    def compute() -> dict[str, Any]:
+        calls.append(1)
+        return {"n": len(calls)}
+
+    assert cache.get_or_compute("k", compute) == ({"n": 1}, None)
+
+    clock.now += 30
+    assert cache.get_or_compute("k", compute) == ({"n": 1}, 30)
+
+    clock.now += 31
+    assert cache.get_or_compute("k", compute) == ({"n": 2}, None)
+    assert len(calls) == 2
+
+
+def test_result_cache_bypass_refreshes_entry() -> None:
+    """Test that bypass skips the lookup but stores the new result."""
+    clock = FakeClock()
+    cache = ResultCache(MemoryBackend(), ttl_seconds=60, clock=clock)
+
+    cache.get_or_compute("k", lambda: {"v": "old"})
+    result, age = cache.get_or_compute("k", lambda: {"v": "new"}, bypass=True)
+    assert result == {"v": "new"}
+    assert age is None
+
+    result, age = cache.get_or_compute("k", lambda: {"v": "unused"})
+    assert result == {"v": "new"}
+    assert age == 0
+
+
+def test_result_cache_should_store() -> None:
+    """Test that rejected results are not cached."""
+    cache = ResultCache(MemoryBackend(), ttl_seconds=60)
+    should_store = lambda r: "error" not in r  # noqa: E731
+
+    cache.get_or_compute("k", lambda: {"error": {}}, should_store=should_store)
+    result, age = cache.get_or_compute("k", lambda: {"ok": True}, should_store=should_store)
+    assert result == {"ok": True}
+    assert age is None
+
+
+def test_result_cache_single_flight() -> None:
+    """Test that concurrent identical requests share one computation."""
+    cache = ResultCache(MemoryBackend(), ttl_seconds=60)
+    calls = []
+    started = threading.Event()
+
+    def compute() -> dict[str, Any]:
+        calls.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {"ok": True}
+
+    results: list[tuple[dict[str, Any], float | None]] = []
+
+    def worker() -> None:
+        results.append(cache.get_or_compute("k", compute))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=worker) for _ in range(4)]
+    for t in followers:
+        t.start()
+    for t in [leader, *followers]:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 5
+    assert all(r == {"ok": True} for r, _ in results)
+    assert sum(1 for _, age in results if age is None) == 1
+
+
+def test_result_cache_single_flight_propagates_errors() -> None:
+    """Test that a failing computation is not cached."""
+    cache = ResultCache(MemoryBackend(), ttl_seconds=60)
+
+    def fail() -> dict[str, Any]:
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("k", fail)
+    assert cache.get_or_compute("k", lambda: {"ok": True}) == ({"ok": True}, None)
+
+
+def test_result_cache_zero_ttl_disables_caching() -> None:
+    """Test that a TTL of 0 always recomputes."""
+    cache = ResultCache(MemoryBackend(), ttl_seconds=0)
+    cache.get_or_compute("k", lambda: {"n": 1})
+    assert cache.get_or_compute("k", lambda: {"n": 2}) == ({"n": 2}, None)
+
+
+def test_memory_backend_evicts_oldest() -> None:
+    """Test LRU eviction once max_entries is exceeded."""
+    backend = MemoryBackend(max_entries=2)
+    backend.set("a", {}, 0)
+    backend.set("b", {}, 0)
+    backend.get("a")
+    backend.set("c", {}, 0)
+
+    assert backend.get("a") is not None
+    assert backend.get("b") is None
+    assert backend.get("c") is not None
+
+
+def test_disk_backend_roundtrip(tmp_path: Path) -> None:
+    """Test that the disk backend persists entries across instances."""
+    DiskBackend(tmp_path).set("k", {"items": [1, 2]}, 123.0)
+
+    backend = DiskBackend(tmp_path)
+    assert backend.get("k") == (123.0, {"items": [1, 2]})
+
+    backend.delete("k")
+    assert backend.get("k") is None
+
+
+def test_disk_backend_prunes_expired_entries(tmp_path: Path) -> None:
+    """Test that set() deletes entry files older than max_age_seconds."""
+    clock = FakeClock()
+    backend = DiskBackend(tmp_path, max_age_seconds=60, clock=clock)
+    backend.set("old", {"n": 1}, clock.now)
+    os.utime(tmp_path / "old.json", (clock.now - 61, clock.now - 61))
+
+    backend.set("new", {"n": 2}, clock.now)
+
+    assert backend.get("old") is None
+    assert backend.get("new") == (clock.now, {"n": 2})
+
+
+def test_disk_backend_ignores_corrupt_files(tmp_path: Path) -> None:
+    """Test that unreadable entries are treated as misses."""
+    (tmp_path / "k.json").write_text("{not json")
+    assert DiskBackend(tmp_path).get("k") is None
+
+
+@mock_aws
+def test_handler_serves_identical_requests_from_cache() -> None:
+    """Test handler meta reports cache hits and bypass forces a rescan."""
+    ec2 = boto3.client("ec2", region_name="us-east-1")
+    ec2.create_volume(Size=15, AvailabilityZone="us-east-1a")
+
+    event = {
+        "role_arn": "arn:aws:iam::123456789012:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1"],
+    }
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+
+        first = handler(event, None)
+        second = handler(event, None)
+        bypassed = handler({**event, "bypass_cache": True}, None)
+
+    assert first["meta"]["cached"] is False
+    assert first["meta"]["cache_age_seconds"] == 0.0
+    assert second["meta"]["cached"] is True
+    assert second["meta"]["cache_age_seconds"] >= 0
+    assert second["items"] == first["items"]
+    assert bypassed["meta"]["cached"] is False
+    assert mock_assume.call_count == 2
+
+
+@mock_aws
+def test_handler_cache_hit_follows_request_region_order() -> None:
+    """Test a hit for the same regions in another order returns items in that order."""
+    for region in ("us-east-1", "us-west-2"):
+        boto3.client("ec2", region_name=region).create_volume(
+            Size=15, AvailabilityZone=f"{region}a"
+        )
+    event = {
+        "role_arn": "arn:aws:iam::123456789012:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-west-2", "us-east-1"],
+    }
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        first = handler(event, None)
+        second = handler({**event, "regions": ["us-east-1", "us-west-2"]}, None)
+
+    assert second["meta"]["cached"] is True
+    assert second["meta"]["regions"] == ["us-east-1", "us-west-2"]
+    assert [item["Region"] for item in first["items"]] == ["us-west-2", "us-east-1"]
+    assert [item["Region"] for item in second["items"]] == ["us-east-1", "us-west-2"]
+
+
+@mock_aws
+def test_handler_does_not_cache_errors() -> None:
+    """Test that failed assume responses are not reused."""
+    from saverbot.errors import AssumeError
+
+    event = {
+        "role_arn": "arn:aws:iam::123456789012:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1"],
+    }
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.side_effect = AssumeError("AccessDenied", "nope")
+        assert handler(event, None)["error"]["code"] == "AccessDenied"
+
+        mock_assume.side_effect = None
+        mock_assume.return_value = boto3.Session()
+        assert handler(event, None)["meta"]["cached"] is False
+
+
+def test_handler_rejects_non_boolean_bypass() -> None:
+    """Test handler validates the bypass_cache flag."""
+    event = {
+        "role_arn": "arn:aws:iam::123456789012:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1"],
+        "bypass_cache": "yes",
+    }
+
+    result = handler(event, None)
+
+    assert result["error"]["code"] == "BadRequest"
+    assert "bypass_cache" in result["error"]["message"]
@@ -0,0 +1,394 @@
+"""Tests for event-driven volume state updates."""
+
+import json
+import random
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler, volume_events_handler
+from saverbot.changefeed import (
+    apply_changes,
+    fill_details,
+    iter_raw_events,
+    parse_volume_event,
+    reconcile,
+)
+from saverbot.errors import AssumeError, StateConflictError
+from saverbot.state import FileStateStore, RegionState, S3StateStore, update_region
+
+FIXTURES = Path(__file__).parent / "fixtures" / "volume_events"
+ACCOUNT = "123456789012"
+VOLUME = "vol-0a1b2c3d4e5f60001"
+LIFECYCLE = ["create_volume", "attach_volume", "detach_volume", "delete_volume"]
+
+
+def load_event(name: str) -> dict[str, Any]:
+    """Load a recorded EventBridge event."""
+    with open(FIXTURES / f"{name}.json", encoding="utf-8") as f:
+        data: dict[str, Any] = json.load(f)
+    return data
+
+
+def sqs_batch(names: list[str]) -> dict[str, Any]:
+    """Wrap recorded events as an SQS batch."""
+    return {
+        "Records": [
+            {"messageId": f"msg-{i}", "body": json.dumps(load_event(name))}
+            for i, name in enumerate(names)
+        ]
+    }
+
+
+def changes_for(names: list[str]) -> list[Any]:
+    """Parse recorded events into VolumeChanges."""
+    return [parse_volume_event(load_event(name)) for name in names]
+
+
+def test_parse_create_volume_event() -> None:
+    """Test CreateVolume events carry the scanner item details."""
+    change = parse_volume_event(load_event("create_volume"))
+
+    assert change is not None
+    assert (change.account_id, change.region, change.volume_id) == (ACCOUNT, "us-east-1", VOLUME)
+    assert change.event_name == "CreateVolume"
+    assert change.details == {
+        "Size": 100,
+        "SnapshotId": None,
+        "CreateTime": "2026-06-01T10:00:00+00:00",
+        "Tags": {"Name": "scratch"},
+    }
+
+
+def test_parse_skips_failed_and_unrelated_events() -> None:
+    """Test failed API calls and non-volume events produce no change."""
+    assert parse_volume_event(load_event("delete_volume_failed")) is None
+    assert parse_volume_event({"detail-type": "Scheduled Event", "detail": {}}) is None
+
+
+def test_iter_raw_events_unwraps_sqs_batches() -> None:
+    """Test SQS bodies, event lists and single events are all accepted."""
+    batch = sqs_batch(["create_volume", "detach_volume"])
+    batch["Records"].append({"messageId": "msg-bad", "body": "{not json"})
+
+    assert [(message_id, raw is not None) for message_id, raw in iter_raw_events(batch)] == [
+        ("msg-0", True),
+        ("msg-1", True),
+        ("msg-bad", False),
+    ]
+    assert len(list(iter_raw_events({"events": [load_event("create_volume")]}))) == 1
+    assert list(iter_raw_events(load_event("create_volume"))) == [
+        (None, load_event("create_volume"))
+    ]
+
+
+def test_apply_changes_is_order_independent_and_idempotent() -> None:
+    """Test shuffled delivery gives the same state and replays are ignored."""
+    changes = changes_for(LIFECYCLE)
+    random.Random(7).shuffle(changes)
+    state = RegionState(account_id=ACCOUNT, region="us-east-1")
+
+    assert apply_changes(state, changes) == 4
+    assert state.volumes[VOLUME]["State"] == "deleted"
+    assert state.unattached_items() == []
+    assert apply_changes(state, changes) == 0
+
+
+def test_apply_changes_tracks_detached_volume() -> None:
+    """Test a detached volume is reported with its details."""
+    state = RegionState(account_id=ACCOUNT, region="us-east-1")
+    apply_changes(state, changes_for(["create_volume", "attach_volume"]))
+    assert state.unattached_items() == []
+
+    apply_changes(state, changes_for(["detach_volume"]))
+
+    assert state.unattached_items() == [
+        {
+            "Region": "us-east-1",
+            "VolumeId": VOLUME,
+            "Size": 100,
+            "SnapshotId": None,
+            "CreateTime": "2026-06-01T10:00:00+00:00",
+            "Tags": {"Name": "scratch"},
+        }
+    ]
+
+
+def test_fill_details_completes_partial_volumes() -> None:
+    """Test volumes first seen detached take the described details and state."""
+    state = RegionState(account_id=ACCOUNT, region="us-east-1")
+    apply_changes(state, changes_for(["detach_volume"]))
+    for volume_id in ("vol-gone", "vol-reattached"):
+        state.volumes[volume_id] = {**state.volumes[VOLUME], "VolumeId": volume_id}
+    assert sorted(state.partial_volume_ids()) == [VOLUME, "vol-gone", "vol-reattached"]
+
+    described = {
+        "Region": "us-east-1",
+        "VolumeId": VOLUME,
+        "Size": 100,
+        "SnapshotId": None,
+        "CreateTime": "2026-06-01T10:00:00+00:00",
+        "Tags": {"Name": "scratch"},
+    }
+    # Attached again before its AttachVolume event arrived
+    reattached = {**described, "VolumeId": "vol-reattached", "State": "in-use"}
+    changed = fill_details(
+        state,
+        [VOLUME, "vol-gone", "vol-reattached"],
+        [{**described, "State": "available"}, reattached],
+        "2026-06-01T12:00:00+00:00",
+    )
+
+    assert changed is True
+    assert state.partial_volume_ids() == []
+    assert state.unattached_items() == [described]
+    assert state.volumes["vol-gone"]["State"] == "deleted"
+    assert state.volumes["vol-reattached"]["State"] == "in-use"
+    assert state.volumes["vol-reattached"]["Size"] == 100
+
+
+def test_fill_details_keeps_state_from_newer_events() -> None:
+    """Test an event applied after the describe call wins over the described state."""
+    state = RegionState(account_id=ACCOUNT, region="us-east-1")
+    apply_changes(state, changes_for(["detach_volume"]))
+    described = {"Region": "us-east-1", "VolumeId": VOLUME, "Size": 100, "State": "in-use"}
+
+    fill_details(state, [VOLUME], [described], "2026-06-01T10:30:00+00:00")
+
+    assert state.volumes[VOLUME]["State"] == "available"
+    assert state.volumes[VOLUME]["Size"] == 100
+    assert state.partial_volume_ids() == []
+
+
+def test_reconcile_keeps_changes_newer_than_scan() -> None:
+    """Test reconciliation replaces state but keeps events after the scan started."""
+    state = RegionState(account_id=ACCOUNT, region="us-east-1")
+    apply_changes(state, changes_for(["create_volume", "attach_volume", "detach_volume"]))
+
+    reconcile(state, [{"Region": "us-east-1", "VolumeId": "vol-old"}], "2026-06-01T10:30:00+00:00")
+
+    assert set(state.volumes) == {"vol-old", VOLUME}
+    # Events up to the reconciliation time are now ignored
+    assert apply_changes(state, changes_for(["attach_volume"])) == 0
+
+
+def test_file_state_store_detects_conflicts(tmp_path: Path) -> None:
+    """Test a save based on a stale load raises StateConflictError."""
+    store = FileStateStore(tmp_path)
+    first = store.load(ACCOUNT, "us-east-1")
+    second = store.load(ACCOUNT, "us-east-1")
+
+    store.save(first)
+    with pytest.raises(StateConflictError):
+        store.save(second)
+
+    assert store.load(ACCOUNT, "us-east-1").version == first.version
+
+
+def test_update_region_retries_after_conflict(tmp_path: Path) -> None:
+    """Test update_region reloads and reapplies when another writer wins."""
+    store = FileStateStore(tmp_path)
+    calls = 0
+
+    def mutate(state: RegionState) -> bool:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            # A concurrent writer saves between our load and save
+            other = store.load(ACCOUNT, "us-east-1")
+            apply_changes(other, changes_for(["create_volume"]))
+            store.save(other)
+        apply_changes(state, changes_for(["attach_volume"]))
+        return True
+
+    state = update_region(store, ACCOUNT, "us-east-1", mutate)
+
+    assert calls == 2
+    assert state.volumes[VOLUME]["State"] == "in-use"
+    assert state.volumes[VOLUME]["Size"] == 100
+
+
+@mock_aws
+def test_s3_state_store_uses_conditional_writes() -> None:
+    """Test S3 saves fail when the object changed since it was loaded."""
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="state-bucket")
+    store = S3StateStore(s3, "state-bucket")
+
+    first = store.load(ACCOUNT, "us-east-1")
+    second = store.load(ACCOUNT, "us-east-1")
+    apply_changes(first, changes_for(["create_volume"]))
+    store.save(first)
+
+    # Object now exists, so a create-only write conflicts
+    with pytest.raises(StateConflictError):
+        store.save(second)
+
+    loaded = store.load(ACCOUNT, "us-east-1")
+    assert loaded.volumes[VOLUME]["State"] == "available"
+    apply_changes(loaded, changes_for(["attach_volume"]))
+    store.save(loaded)
+    # first still holds the ETag from before loaded was saved
+    with pytest.raises(StateConflictError):
+        store.save(first)
+
+
+def test_volume_events_handler_applies_batch(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test the events entry point applies an SQS batch to the store."""
+    saver_env(state_backend="file", state_dir=tmp_path)
+    store = FileStateStore(tmp_path)
+
+    result = volume_events_handler(
+        sqs_batch(["create_volume", "attach_volume", "detach_volume", "delete_volume_failed"]),
+        None,
+    )
+
+    assert result["meta"]["received"] == 4
+    assert result["meta"]["applied"] == 3
+    assert result["meta"]["ignored"] == 1
+    assert result["meta"]["regions"] == [f"{ACCOUNT}/us-east-1"]
+    assert result["batchItemFailures"] == []
+    state = store.load(ACCOUNT, "us-east-1")
+    assert [item["VolumeId"] for item in state.unattached_items()] == [VOLUME]
+
+    # Replaying the batch changes nothing and does not rewrite the state
+    version = state.version
+    replay = volume_events_handler(sqs_batch(["create_volume", "detach_volume"]), None)
+    assert replay["meta"]["applied"] == 0
+    assert store.load(ACCOUNT, "us-east-1").version == version
+
+
+def test_volume_events_handler_reports_failed_records(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test malformed bodies and unsaved regions fail only their own SQS records."""
+    saver_env(state_backend="file", state_dir=tmp_path)
+    other_region = load_event("create_volume")
+    other_region["region"] = "eu-west-1"
+    batch = sqs_batch(["create_volume"])
+    batch["Records"] += [
+        {"messageId": "msg-bad", "body": "{not json"},
+        {"messageId": "msg-eu", "body": json.dumps(other_region)},
+    ]
+    save = FileStateStore.save
+
+    def save_or_conflict(store: FileStateStore, state: RegionState) -> None:
+        if state.region == "eu-west-1":
+            raise StateConflictError(state.account_id, state.region)
+        save(store, state)
+
+    with patch.object(FileStateStore, "save", save_or_conflict):
+        result = volume_events_handler(batch, None)
+
+    assert result["batchItemFailures"] == [
+        {"itemIdentifier": "msg-bad"},
+        {"itemIdentifier": "msg-eu"},
+    ]
+    assert result["meta"]["applied"] == 1
+    assert result["meta"]["failed"] == 2
+    state = FileStateStore(tmp_path).load(ACCOUNT, "us-east-1")
+    assert [item["VolumeId"] for item in state.unattached_items()] == [VOLUME]
+
+
+def test_volume_events_handler_requires_state_store() -> None:
+    """Test events are rejected when no state store is configured."""
+    result = volume_events_handler(load_event("create_volume"), None)
+
+    assert result["error"]["code"] == "StateStoreNotConfigured"
+
+
+@mock_aws
+def test_scan_from_state_skips_describe_volumes(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test a reconciled region is served from state without scanning describe_volumes."""
+    saver_env(state_backend="file", state_dir=tmp_path, cache_ttl_seconds=0)
+
+    ec2 = boto3.client("ec2", region_name="us-east-1")
+    existing = ec2.create_volume(Size=10, AvailabilityZone="us-east-1a")["VolumeId"]
+    attached = ec2.create_volume(
+        Size=42,
+        AvailabilityZone="us-east-1a",
+        TagSpecifications=[{"ResourceType": "volume", "Tags": [{"Key": "Name", "Value": "data"}]}],
+    )["VolumeId"]
+    instance_id = ec2.run_instances(
+        ImageId="ami-12345678",
+        MinCount=1,
+        MaxCount=1,
+        Placement={"AvailabilityZone": "us-east-1a"},
+    )["Instances"][0]["InstanceId"]
+    ec2.attach_volume(VolumeId=attached, InstanceId=instance_id, Device="/dev/sdf")
+    event = {
+        "role_arn": f"arn:aws:iam::{ACCOUNT}:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1", "us-west-2"],
+        "source": "state",
+    }
+
+    # No state yet: both regions are scanned and reconciled
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        first = handler(event, None)
+    assert first["meta"]["sources"] == {"us-east-1": "api", "us-west-2": "api"}
+    assert [item["VolumeId"] for item in first["items"]] == [existing]
+
+    # The volume in use at scan time is detached; only the event reaches the state
+    ec2.detach_volume(VolumeId=attached, InstanceId=instance_id)
+    detach = load_event("detach_volume")
+    detach["time"] = "2999-01-01T00:00:00Z"
+    detach["detail"]["requestParameters"]["volumeId"] = attached
+    detach["detail"]["responseElements"]["volumeId"] = attached
+    volume_events_handler(detach, None)
+    store = FileStateStore(tmp_path)
+    assert store.load(ACCOUNT, "us-east-1").partial_volume_ids() == [attached]
+
+    with (
+        patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume,
+        patch(
+            "lambdas.scan_ec2_unattached_ebs.handler.iter_unattached_volume_pages"
+        ) as mock_pages,
+    ):
+        mock_assume.return_value = boto3.Session()
+        second = handler(event, None)
+        mock_assume.assert_called_once_with(event["role_arn"], event["external_id"])
+        mock_pages.assert_not_called()
+
+    assert second["meta"]["sources"] == {"us-east-1": "state", "us-west-2": "state"}
+    assert second["count"] == 2
+    items = {item["VolumeId"]: item for item in second["items"]}
+    assert set(items) == {existing, attached}
+    # Details of the detached volume come from describe_volumes by ID and are stored
+    assert items[attached]["Size"] == 42
+    assert items[attached]["Tags"] == {"Name": "data"}
+    assert items[attached]["CreateTime"] is not None
+    assert store.load(ACCOUNT, "us-east-1").partial_volume_ids() == []
+
+
+@mock_aws
+def test_scan_from_state_still_requires_assume(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test stored state is not returned when the role cannot be assumed."""
+    saver_env(state_backend="file", state_dir=tmp_path, cache_ttl_seconds=0)
+    event = {
+        "role_arn": f"arn:aws:iam::{ACCOUNT}:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1"],
+        "source": "state",
+    }
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        handler(event, None)
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.side_effect = AssumeError("AccessDenied", "External ID mismatch")
+        result = handler({**event, "external_id": "wrong"}, None)
+
+    assert result == {"error": {"code": "AccessDenied", "message": "External ID mismatch"}}
@@ -4,7 +4,7 @@ import boto3
 from moto import mock_aws
 
 from lambdas.scan_ec2_unattached_ebs.handler import handler
-from saverbot.scanners.ec2_unattached import list_unattached_volumes
+from saverbot.scanners.ec2_unattached import describe_volumes_by_id, list_unattached_volumes
 
 
 @mock_aws
@@ -89,6 +89,29 @@ def test_list_unattached_volumes_empty() -> None:
     assert volumes == []
 
 
+@mock_aws
+def test_describe_volumes_by_id_skips_missing_volumes() -> None:
+    """Test volumes are described whatever their state and missing IDs are left out."""
+    ec2 = boto3.client("ec2", region_name="us-east-1")
+    volume_id = ec2.create_volume(
+        Size=42,
+        AvailabilityZone="us-east-1a",
+        TagSpecifications=[{"ResourceType": "volume", "Tags": [{"Key": "Name", "Value": "data"}]}],
+    )["VolumeId"]
+    instance_id = ec2.run_instances(ImageId="ami-12345678", MinCount=1, MaxCount=1)[
+        "Instances"
+    ][0]["InstanceId"]
+    ec2.attach_volume(VolumeId=volume_id, InstanceId=instance_id, Device="/dev/sdf")
+
+    volumes = describe_volumes_by_id(
+        boto3.Session(), "us-east-1", [volume_id, "vol-0000000000000dead"]
+    )
+
+    assert [(v["VolumeId"], v["Size"], v["Tags"], v["State"]) for v in volumes] == [
+        (volume_id, 42, {"Name": "data"}, "in-use")
+    ]
+
+
 @mock_aws
 def test_handler_happy_path() -> None:
     """Test Lambda handler with valid input returns correct schema."""
@@ -235,6 +258,7 @@ def test_handler_with_successful_assume() -> None:
         # Check meta
         assert result["meta"]["service"] == "ec2"
         assert result["meta"]["rule"] == "ebs-unattached"
+        assert result["meta"]["account_id"] == "123456789012"
         assert result["meta"]["regions"] == ["us-east-1"]
         assert "scanned_at" in result["meta"]
         assert "duration_ms" in result["meta"]
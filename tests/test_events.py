@@ -0,0 +1,111 @@
+"""Tests for Lambda event schema validation."""
+
+import pytest
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler
+from saverbot.errors import EventValidationError
+from saverbot.events import ScanEvent, parse_scan_event
+
+VALID_EVENT = {
+    "role_arn": "arn:aws:iam::123456789012:role/test",
+    "external_id": "test-external-id",
+    "regions": ["us-east-1", "eu-west-1"],
+}
+
+
+def test_parse_valid_event() -> None:
+    """Test that a valid event parses into an immutable ScanEvent."""
+    event = parse_scan_event({**VALID_EVENT, "unrelated": 1})
+
+    assert isinstance(event, ScanEvent)
+    assert event.regions == ["us-east-1", "eu-west-1"]
+    assert event.bypass_cache is False
+    assert event.source == "api"
+    with pytest.raises(ValueError):
+        event.role_arn = "other"
+
+
+def test_parse_reports_every_error() -> None:
+    """Test that all problems are reported in one error."""
+    with pytest.raises(EventValidationError) as exc_info:
+        parse_scan_event(
+            {
+                "role_arn": "not-an-arn",
+                "regions": ["us-east-1", "mars-north-1", 7],
+                "bypass_cache": "yes",
+            }
+        )
+
+    fields = {e["field"]: e["message"] for e in exc_info.value.errors}
+    assert fields["role_arn"] == "Invalid IAM role ARN"
+    assert fields["external_id"] == "Field required"
+    assert fields["regions[1]"] == "Unknown region 'mars-north-1'"
+    assert "string" in fields["regions[2]"]
+    assert "boolean" in fields["bypass_cache"]
+    assert exc_info.value.code == "BadRequest"
+    assert "regions[1]: Unknown region" in exc_info.value.message
+
+
+@pytest.mark.parametrize(
+    "role_arn",
+    [
+        "arn:aws:iam::123456789012:role/path/to/MyRole",
+        "arn:aws-us-gov:iam::123456789012:role/gov-role",
+        "arn:aws-cn:iam::123456789012:role/cn.role@x",
+    ],
+)
+def test_parse_accepts_role_arn_partitions(role_arn: str) -> None:
+    """Test ARNs in every partition are accepted."""
+    assert parse_scan_event({**VALID_EVENT, "role_arn": role_arn}).role_arn == role_arn
+
+
+@pytest.mark.parametrize(
+    "role_arn",
+    [
+        "arn:aws:iam::12345:role/test",
+        "arn:aws:iam::123456789012:user/test",
+        "arn:aws:s3:::bucket",
+    ],
+)
+def test_parse_rejects_bad_role_arn(role_arn: str) -> None:
+    """Test that malformed or non-role ARNs are rejected."""
+    with pytest.raises(EventValidationError) as exc_info:
+        parse_scan_event({**VALID_EVENT, "role_arn": role_arn})
+
+    assert exc_info.value.errors[0]["field"] == "role_arn"
+
+
+def test_parse_rejects_bad_external_id() -> None:
+    """Test that external IDs outside the STS constraints are rejected."""
+    with pytest.raises(EventValidationError) as exc_info:
+        parse_scan_event({**VALID_EVENT, "external_id": "has spaces"})
+
+    assert exc_info.value.errors[0]["field"] == "external_id"
+
+
+def test_parse_rejects_unknown_source() -> None:
+    """Test that source must be "api" or "state"."""
+    with pytest.raises(EventValidationError) as exc_info:
+        parse_scan_event({**VALID_EVENT, "source": "cache"})
+
+    assert exc_info.value.errors[0]["field"] == "source"
+
+
+def test_parse_large_region_list() -> None:
+    """Test that batch-sized lists validate and report per-item errors."""
+    regions = ["us-east-1"] * 5000
+    regions[4321] = "nope-1"
+
+    with pytest.raises(EventValidationError) as exc_info:
+        parse_scan_event({**VALID_EVENT, "regions": regions})
+
+    assert [e["field"] for e in exc_info.value.errors] == ["regions[4321]"]
+
+
+def test_handler_returns_all_validation_errors() -> None:
+    """Test that the handler surfaces every validation error in details."""
+    result = handler({"regions": []}, None)
+
+    assert result["error"]["code"] == "BadRequest"
+    fields = {d["field"] for d in result["error"]["details"]}
+    assert fields == {"role_arn", "external_id", "regions"}
@@ -0,0 +1,284 @@
+"""Tests for concurrent Lambda fan-out against a local stand-in endpoint."""
+
+import json
+import threading
+import time
+from collections.abc import Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+import boto3
+import pytest
+from botocore.config import Config
+
+from saverbot.fanout import (
+    Shard,
+    invoke_shard,
+    lambda_client_config,
+    make_shards,
+    run_fanout,
+)
+from saverbot.sinks import FileSink, write_items
+
+TARGET = {
+    "role_arn": "arn:aws:iam::123456789012:role/test",
+    "external_id": "test-external-id",
+    "regions": ["us-east-1", "us-east-2", "us-west-1", "us-west-2", "eu-west-1"],
+}
+
+
+class StandInLambda:
+    """Local HTTP server speaking the Lambda Invoke API."""
+
+    def __init__(self, respond: Callable[[dict[str, Any]], tuple[int, dict[str, Any], Any]]):
+        self.respond = respond
+        self.events: list[dict[str, Any]] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                event = json.loads(body)
+                with stand_in.lock:
+                    stand_in.events.append(event)
+                    stand_in.in_flight += 1
+                    stand_in.max_in_flight = max(stand_in.max_in_flight, stand_in.in_flight)
+                try:
+                    status, headers, payload = stand_in.respond(event)
+                finally:
+                    with stand_in.lock:
+                        stand_in.in_flight -= 1
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def client(self, read_timeout: float | None = None) -> Any:
+        config = lambda_client_config(function_timeout_seconds=5, max_concurrency=32)
+        if read_timeout is not None:
+            config = config.merge(Config(read_timeout=read_timeout))
+        return boto3.client(
+            "lambda",
+            region_name="us-east-1",
+            endpoint_url=self.endpoint_url,
+            aws_access_key_id="testing",
+            aws_secret_access_key="testing",
+            config=config,
+        )
+
+
+@pytest.fixture
+def stand_in() -> Iterator[Callable[..., StandInLambda]]:
+    servers: list[StandInLambda] = []
+
+    def start(respond: Callable[[dict[str, Any]], tuple[int, dict[str, Any], Any]]) -> Any:
+        server = StandInLambda(respond)
+        server.thread.start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.server.shutdown()
+        server.server.server_close()
+
+
+def scan_result(event: dict[str, Any]) -> dict[str, Any]:
+    """Fake handler output with one item per region."""
+    items = [{"Region": r, "VolumeId": f"vol-{r}", "Size": 1} for r in event["regions"]]
+    meta = {"regions": event["regions"], "cached": False}
+    return {"meta": meta, "items": items, "count": len(items)}
+
+
+def test_make_shards() -> None:
+    """Test regions are split per target into bounded shards."""
+    other = {**TARGET, "role_arn": "arn:aws:iam::210987654321:role/test", "regions": ["sa-east-1"]}
+
+    shards = make_shards([TARGET, other], regions_per_shard=2)
+
+    assert [s.event["regions"] for s in shards] == [
+        ["us-east-1", "us-east-2"],
+        ["us-west-1", "us-west-2"],
+        ["eu-west-1"],
+        ["sa-east-1"],
+    ]
+    assert shards[-1].event["role_arn"] == other["role_arn"]
+    assert len({s.shard_id for s in shards}) == 4
+    with pytest.raises(ValueError):
+        make_shards([TARGET], regions_per_shard=0)
+
+
+def test_run_fanout_merges_results_with_bounded_concurrency(
+    stand_in: Callable[..., StandInLambda],
+) -> None:
+    """Test all shards run, items stream out and concurrency is bounded."""
+
+    def respond(event: dict[str, Any]) -> tuple[int, dict[str, Any], Any]:
+        time.sleep(0.05)
+        return 200, {}, scan_result(event)
+
+    server = stand_in(respond)
+    shards = make_shards([TARGET])
+    streamed: list[dict[str, Any]] = []
+
+    manifest = run_fanout(
+        server.client(),
+        "scan",
+        shards,
+        max_concurrency=2,
+        on_items=lambda _, items: streamed.extend(items),
+    )
+
+    assert manifest["shard_count"] == 5
+    assert manifest["failed_shards"] == 0
+    assert manifest["total_count"] == 5
+    assert [e["shard_id"] for e in manifest["shards"]] == [s.shard_id for s in shards]
+    assert all(e["status"] == "ok" and e["attempts"] == 1 for e in manifest["shards"])
+    assert sorted(i["Region"] for i in streamed) == sorted(TARGET["regions"])
+    assert server.max_in_flight <= 2
+
+
+def test_run_fanout_reads_items_streamed_to_a_sink(
+    stand_in: Callable[..., StandInLambda], tmp_path: Path
+) -> None:
+    """Test budgeted shards hand on the items stored at their items_location."""
+
+    def respond(event: dict[str, Any]) -> tuple[int, dict[str, Any], Any]:
+        result = scan_result(event)
+        location, count = write_items(result.pop("items"), FileSink(tmp_path))
+        return 200, {}, {**result, "items_location": location, "count": count}
+
+    server = stand_in(respond)
+    streamed: list[dict[str, Any]] = []
+
+    manifest = run_fanout(
+        server.client(),
+        "scan",
+        make_shards([TARGET]),
+        on_items=lambda _, items: streamed.extend(items),
+    )
+
+    assert manifest["total_count"] == 5
+    assert all(e["items_location"]["type"] == "file" for e in manifest["shards"])
+    assert sorted(i["Region"] for i in streamed) == sorted(TARGET["regions"])
+
+
+def test_invoke_shard_retries_throttling(stand_in: Callable[..., StandInLambda]) -> None:
+    """Test throttled invocations are retried with backoff."""
+    calls = []
+
+    def respond(event: dict[str, Any]) -> tuple[int, dict[str, Any], Any]:
+        calls.append(event)
+        if len(calls) < 3:
+            return (
+                429,
+                {"x-amzn-ErrorType": "TooManyRequestsException"},
+                {"message": "Rate exceeded"},
+            )
+        return 200, {}, scan_result(event)
+
+    server = stand_in(respond)
+    sleeps: list[float] = []
+
+    result = invoke_shard(
+        server.client(), "scan", Shard("s", TARGET), backoff_base=0.1, sleep=sleeps.append
+    )
+
+    assert result.ok
+    assert result.attempts == 3
+    assert len(sleeps) == 2
+    assert 0.05 <= sleeps[0] <= 0.15
+    assert 0.1 <= sleeps[1] <= 0.3
+
+
+def test_invoke_shard_gives_up_after_max_attempts(stand_in: Callable[..., StandInLambda]) -> None:
+    """Test persistent throttling is reported as a failed shard."""
+    server = stand_in(
+        lambda event: (429, {"x-amzn-ErrorType": "TooManyRequestsException"}, {"message": "slow"})
+    )
+
+    result = invoke_shard(
+        server.client(), "scan", Shard("s", TARGET), max_attempts=3, sleep=lambda _: None
+    )
+
+    assert not result.ok
+    assert result.attempts == 3
+    # botocore does not retry on its own: one request per attempt
+    assert len(server.events) == 3
+    assert result.error is not None
+    assert result.error["code"] == "TooManyRequestsException"
+
+
+def test_lambda_client_config_disables_botocore_retries() -> None:
+    """Test the client leaves retries to invoke_shard and outwaits the function."""
+    config = lambda_client_config(function_timeout_seconds=60, max_concurrency=16)
+
+    assert config.retries == {"total_max_attempts": 1}  # type: ignore[attr-defined]
+    assert config.read_timeout > 60  # type: ignore[attr-defined]
+    assert config.max_pool_connections == 16  # type: ignore[attr-defined]
+
+
+def test_invoke_shard_does_not_retry_read_timeouts(
+    stand_in: Callable[..., StandInLambda],
+) -> None:
+    """Test a timed-out invocation is reported, not re-invoked while it may still run."""
+
+    def respond(event: dict[str, Any]) -> tuple[int, dict[str, Any], Any]:
+        time.sleep(0.5)
+        return 200, {}, scan_result(event)
+
+    server = stand_in(respond)
+
+    result = invoke_shard(
+        server.client(read_timeout=0.1), "scan", Shard("s", TARGET), sleep=lambda _: None
+    )
+
+    assert not result.ok
+    assert result.attempts == 1
+    assert result.error is not None
+    assert result.error["code"] == "ReadTimeoutError"
+    assert len(server.events) == 1
+
+
+def test_run_fanout_reports_handled_and_unhandled_errors(
+    stand_in: Callable[..., StandInLambda],
+) -> None:
+    """Test error payloads and function errors fail their shard without retries."""
+
+    def respond(event: dict[str, Any]) -> tuple[int, dict[str, Any], Any]:
+        region = event["regions"][0]
+        if region == "us-east-2":
+            return 200, {}, {"error": {"code": "AccessDenied", "message": "nope"}}
+        if region == "us-west-1":
+            return 200, {"X-Amz-Function-Error": "Unhandled"}, {"errorMessage": "boom"}
+        return 200, {}, scan_result(event)
+
+    server = stand_in(respond)
+
+    manifest = run_fanout(server.client(), "scan", make_shards([TARGET]))
+
+    by_region = {e["shard_id"].split(":")[1]: e for e in manifest["shards"]}
+    assert manifest["failed_shards"] == 2
+    assert manifest["total_count"] == 3
+    assert by_region["us-east-2"]["error"]["code"] == "AccessDenied"
+    assert by_region["us-west-1"]["error"]["code"] == "InvokeError"
+    assert by_region["us-west-1"]["attempts"] == 1
+    assert len(server.events) == 5
@@ -0,0 +1,201 @@
+"""Tests for Parquet scan history export."""
+
+from pathlib import Path
+from typing import Any
+
+import boto3
+import pytest
+from moto import mock_aws
+
+pa = pytest.importorskip("pyarrow")
+
+from saverbot.history import (  # noqa: E402
+    compact,
+    history_schema,
+    orphaned_gib_by_day,
+    read_history,
+    write_scan_result,
+)
+from saverbot.sinks import S3Sink, write_items  # noqa: E402
+
+
+def make_result(scanned_at: str, items: list[dict[str, Any]]) -> dict[str, Any]:
+    """Build a handler result with the given items."""
+    return {
+        "meta": {
+            "service": "ec2",
+            "rule": "ebs-unattached",
+            "account_id": "123456789012",
+            "regions": sorted({i["Region"] for i in items}),
+            "scanned_at": scanned_at,
+            "duration_ms": 5,
+        },
+        "items": items,
+        "count": len(items),
+    }
+
+
+def make_item(volume_id: str, size: int, region: str = "us-east-1") -> dict[str, Any]:
+    """Build a scanner item."""
+    return {
+        "Region": region,
+        "VolumeId": volume_id,
+        "Size": size,
+        "CreateTime": "2024-01-01T00:00:00+00:00",
+        "Tags": {"Name": volume_id, "team": "core"},
+    }
+
+
+def test_write_partitions_by_date_account_region(tmp_path: Path) -> None:
+    """Test files land in hive-style date/account/region partitions."""
+    result = make_result(
+        "2024-03-01T12:00:00+00:00",
+        [make_item("vol-1", 10), make_item("vol-2", 20, region="eu-west-1")],
+    )
+
+    written = write_scan_result(result, tmp_path)
+
+    relative = sorted(str(p.parent.relative_to(tmp_path)) for p in written)
+    assert relative == [
+        "date=2024-03-01/account=123456789012/region=eu-west-1",
+        "date=2024-03-01/account=123456789012/region=us-east-1",
+    ]
+
+
+def test_read_roundtrip_with_map_tags(tmp_path: Path) -> None:
+    """Test rows read back with the stable schema and tags as a map."""
+    write_scan_result(make_result("2024-03-01T12:00:00+00:00", [make_item("vol-1", 10)]), tmp_path)
+
+    table = read_history(tmp_path)
+
+    assert table.schema.field("tags").type == pa.map_(pa.string(), pa.string())
+    for field in history_schema():
+        assert table.schema.field(field.name).type == field.type
+    row = table.to_pylist()[0]
+    assert row["volume_id"] == "vol-1"
+    assert row["size_gib"] == 10
+    assert dict(row["tags"]) == {"Name": "vol-1", "team": "core"}
+    assert (row["date"], row["account"], row["region"]) == (
+        "2024-03-01",
+        "123456789012",
+        "us-east-1",
+    )
+
+
+def test_read_projects_columns_and_filters_partitions(tmp_path: Path) -> None:
+    """Test that only requested columns are returned and filters apply."""
+    import pyarrow.compute as pc
+
+    write_scan_result(
+        make_result(
+            "2024-03-01T12:00:00+00:00",
+            [make_item("vol-1", 10), make_item("vol-2", 20, region="eu-west-1")],
+        ),
+        tmp_path,
+    )
+
+    table = read_history(
+        tmp_path, columns=["volume_id", "size_gib"], filter=pc.field("region") == "eu-west-1"
+    )
+
+    assert table.column_names == ["volume_id", "size_gib"]
+    assert table.to_pylist() == [{"volume_id": "vol-2", "size_gib": 20}]
+
+
+def test_write_empty_result_writes_nothing(tmp_path: Path) -> None:
+    """Test that scans without items produce no files."""
+    assert write_scan_result(make_result("2024-03-01T12:00:00+00:00", []), tmp_path) == []
+
+
+@mock_aws
+def test_write_scan_result_reads_items_streamed_to_s3(tmp_path: Path) -> None:
+    """Test budgeted results are exported from their items_location."""
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="results-bucket")
+    result = make_result(
+        "2024-03-01T12:00:00+00:00", [make_item("vol-1", 10), make_item("vol-2", 20)]
+    )
+    sink = S3Sink(s3, "results-bucket", "scan-results/1.ndjson", staging_dir=tmp_path)
+    location, count = write_items(result.pop("items"), sink)
+    result = {**result, "items_location": location, "count": count}
+
+    assert write_scan_result(result, tmp_path / "history", s3_client=s3)
+    table = read_history(tmp_path / "history", columns=["volume_id", "size_gib"])
+    assert sorted(table.to_pylist(), key=lambda r: r["volume_id"]) == [
+        {"volume_id": "vol-1", "size_gib": 10},
+        {"volume_id": "vol-2", "size_gib": 20},
+    ]
+
+
+def test_compact_merges_small_files(tmp_path: Path) -> None:
+    """Test compaction leaves one file per partition and keeps all rows."""
+    for i in range(3):
+        write_scan_result(
+            make_result(f"2024-03-01T1{i}:00:00+00:00", [make_item(f"vol-{i}", 10)]), tmp_path
+        )
+    partition = tmp_path / "date=2024-03-01" / "account=123456789012" / "region=us-east-1"
+    assert len(list(partition.glob("*.parquet"))) == 3
+
+    assert compact(tmp_path) == 1
+
+    files = list(partition.glob("*.parquet"))
+    assert len(files) == 1
+    assert files[0].name.startswith("compacted-")
+    assert sorted(read_history(tmp_path, columns=["volume_id"])["volume_id"].to_pylist()) == [
+        "vol-0",
+        "vol-1",
+        "vol-2",
+    ]
+    assert compact(tmp_path) == 0
+
+
+def test_orphaned_gib_by_day(tmp_path: Path) -> None:
+    """Test the trend helper aggregates size per day and account."""
+    write_scan_result(
+        make_result(
+            "2024-03-01T12:00:00+00:00",
+            [make_item("vol-1", 10), make_item("vol-2", 20, region="eu-west-1")],
+        ),
+        tmp_path,
+    )
+    write_scan_result(make_result("2024-03-02T12:00:00+00:00", [make_item("vol-1", 10)]), tmp_path)
+
+    assert orphaned_gib_by_day(tmp_path) == [
+        {"date": "2024-03-01", "account": "123456789012", "size_gib": 30, "volumes": 2},
+        {"date": "2024-03-02", "account": "123456789012", "size_gib": 10, "volumes": 1},
+    ]
+
+
+def test_orphaned_gib_by_day_counts_repeated_scans_once(tmp_path: Path) -> None:
+    """Test hourly scans of the same volume count it once per day."""
+    for hour in range(24):
+        items = [make_item("vol-1", 10)]
+        if hour >= 12:
+            # Appears mid-day and is resized before the last scan
+            items.append(make_item("vol-2", 20 if hour < 23 else 30, region="eu-west-1"))
+        write_scan_result(make_result(f"2024-03-01T{hour:02d}:00:00+00:00", items), tmp_path)
+    write_scan_result(make_result("2024-03-02T00:00:00+00:00", [make_item("vol-1", 10)]), tmp_path)
+
+    assert orphaned_gib_by_day(tmp_path) == [
+        {"date": "2024-03-01", "account": "123456789012", "size_gib": 40, "volumes": 2},
+        {"date": "2024-03-02", "account": "123456789012", "size_gib": 10, "volumes": 1},
+    ]
+
+
+def test_duplicated_rows_from_interrupted_compaction_count_once(tmp_path: Path) -> None:
+    """Test a crash between rename and unlink does not double-count rows."""
+    for i in range(2):
+        write_scan_result(
+            make_result(f"2024-03-01T1{i}:00:00+00:00", [make_item(f"vol-{i}", 10)]), tmp_path
+        )
+    partition = tmp_path / "date=2024-03-01" / "account=123456789012" / "region=us-east-1"
+    # Merged file renamed into place, inputs not yet removed
+    merged = pa.concat_tables(pa.parquet.read_table(p) for p in sorted(partition.glob("*")))
+    pa.parquet.write_table(merged, partition / "compacted-x.parquet")
+
+    expected = [{"date": "2024-03-01", "account": "123456789012", "size_gib": 20, "volumes": 2}]
+    assert orphaned_gib_by_day(tmp_path) == expected
+
+    assert compact(tmp_path) == 1
+    assert read_history(tmp_path, columns=["volume_id"]).num_rows == 2
+    assert orphaned_gib_by_day(tmp_path) == expected
@@ -0,0 +1,203 @@
+"""Tests for the snapshot and AMI cross-reference index."""
+
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
+from typing import Any
+from unittest.mock import MagicMock, patch
+
+import boto3
+import pytest
+from botocore.stub import Stubber
+from moto import mock_aws
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler
+from saverbot.scanners.snapshot_index import (
+    SnapshotIndex,
+    annotate_volumes,
+    build_snapshot_index,
+    clear_snapshot_index_cache,
+    get_snapshot_index,
+)
+
+NOW = datetime(2024, 6, 1, tzinfo=timezone.utc)
+COMPLETED = {"State": "completed"}
+PENDING = {"State": "pending"}
+
+
+@pytest.fixture(autouse=True)
+def _clear_index_cache() -> Iterator[None]:
+    clear_snapshot_index_cache()
+    yield
+    clear_snapshot_index_cache()
+
+
+def stubbed_session(ec2_client: Any) -> Any:
+    """Return a session whose ec2 client is the given (stubbed) client."""
+    session = MagicMock()
+    session.client.return_value = ec2_client
+    return session
+
+
+def test_build_snapshot_index_uses_paginated_bulk_calls() -> None:
+    """Test the index is built from one call per page, not per volume."""
+    ec2_client = boto3.client("ec2", region_name="us-east-1")
+    stubber = Stubber(ec2_client)
+    stubber.add_response(
+        "describe_snapshots",
+        {
+            "Snapshots": [
+                {"SnapshotId": "snap-1", "VolumeId": "vol-a", "StartTime": NOW, **COMPLETED},
+                {"SnapshotId": "snap-2", "VolumeId": "vol-a", "StartTime": NOW, **COMPLETED},
+            ],
+            "NextToken": "page-2",
+        },
+        {"OwnerIds": ["self"]},
+    )
+    stubber.add_response(
+        "describe_snapshots",
+        {
+            "Snapshots": [
+                {"SnapshotId": "snap-3", "VolumeId": "vol-b", "StartTime": NOW, **COMPLETED}
+            ]
+        },
+        {"OwnerIds": ["self"], "NextToken": "page-2"},
+    )
+    stubber.add_response(
+        "describe_images",
+        {
+            "Images": [
+                {
+                    "ImageId": "ami-1",
+                    "BlockDeviceMappings": [
+                        {"DeviceName": "/dev/sda1", "Ebs": {"SnapshotId": "snap-3"}},
+                        {"DeviceName": "/dev/sdb", "VirtualName": "ephemeral0"},
+                    ],
+                }
+            ]
+        },
+        {"Owners": ["self"]},
+    )
+
+    with stubber:
+        index = build_snapshot_index(stubbed_session(ec2_client), "us-east-1")
+        stubber.assert_no_pending_responses()
+
+    assert index.region == "us-east-1"
+    assert [s for s, _ in index.snapshots_by_volume["vol-a"]] == ["snap-1", "snap-2"]
+    assert [s for s, _ in index.snapshots_by_volume["vol-b"]] == ["snap-3"]
+    assert index.amis_by_snapshot == {"snap-3": ["ami-1"]}
+
+
+def test_incomplete_snapshots_are_not_recent_backups() -> None:
+    """Test pending and error snapshots do not make a volume safe to delete."""
+    ec2_client = boto3.client("ec2", region_name="us-east-1")
+    stubber = Stubber(ec2_client)
+    stubber.add_response(
+        "describe_snapshots",
+        {
+            "Snapshots": [
+                {
+                    "SnapshotId": "snap-old",
+                    "VolumeId": "vol-a",
+                    "StartTime": NOW - timedelta(days=90),
+                    **COMPLETED,
+                },
+                {"SnapshotId": "snap-err", "VolumeId": "vol-a", "StartTime": NOW, "State": "error"},
+                {"SnapshotId": "snap-new", "VolumeId": "vol-b", "StartTime": NOW, **PENDING},
+            ]
+        },
+        {"OwnerIds": ["self"]},
+    )
+    stubber.add_response("describe_images", {"Images": []}, {"Owners": ["self"]})
+
+    with stubber:
+        index = build_snapshot_index(stubbed_session(ec2_client), "us-east-1")
+    volumes: list[dict[str, Any]] = [
+        {"VolumeId": "vol-a", "SnapshotId": None},
+        {"VolumeId": "vol-b", "SnapshotId": None},
+    ]
+    annotate_volumes(volumes, index, recent_days=30, now=NOW)
+
+    assert [s for s, _ in index.snapshots_by_volume["vol-a"]] == ["snap-old"]
+    assert "vol-b" not in index.snapshots_by_volume
+    assert [(v["SnapshotCount"], v["SafeToDelete"]) for v in volumes] == [(1, False), (0, False)]
+
+
+def test_annotate_volumes() -> None:
+    """Test backup annotations and the safe-to-delete flag."""
+    index = SnapshotIndex(
+        region="us-east-1",
+        built_at=0,
+        snapshots_by_volume={
+            "vol-recent": [("snap-old", NOW - timedelta(days=90)), ("snap-new", NOW)],
+            "vol-stale": [("snap-stale", NOW - timedelta(days=90))],
+        },
+        amis_by_snapshot={"snap-new": ["ami-2"], "snap-base": ["ami-1"]},
+    )
+    volumes: list[dict[str, Any]] = [
+        {"VolumeId": "vol-recent", "SnapshotId": None},
+        {"VolumeId": "vol-stale", "SnapshotId": None},
+        {"VolumeId": "vol-from-ami", "SnapshotId": "snap-base"},
+        {"VolumeId": "vol-bare", "SnapshotId": None},
+    ]
+
+    annotate_volumes(volumes, index, recent_days=30, now=NOW)
+    by_id = {v["VolumeId"]: v for v in volumes}
+
+    assert by_id["vol-recent"]["SnapshotCount"] == 2
+    assert by_id["vol-recent"]["LatestSnapshotTime"] == NOW.isoformat()
+    assert by_id["vol-recent"]["AmiIds"] == ["ami-2"]
+    assert by_id["vol-recent"]["SafeToDelete"] is True
+
+    assert by_id["vol-stale"]["SafeToDelete"] is False
+
+    assert by_id["vol-from-ami"]["SnapshotCount"] == 0
+    assert by_id["vol-from-ami"]["AmiIds"] == ["ami-1"]
+    assert by_id["vol-from-ami"]["SafeToDelete"] is True
+
+    assert by_id["vol-bare"]["LatestSnapshotTime"] is None
+    assert by_id["vol-bare"]["SafeToDelete"] is False
+
+
+def test_get_snapshot_index_caches_per_account_and_region() -> None:
+    """Test warm reuse within the TTL and rebuild after it."""
+    clock = MagicMock(return_value=1000.0)
+    with patch("saverbot.scanners.snapshot_index.build_snapshot_index") as mock_build:
+        mock_build.side_effect = lambda session, region: SnapshotIndex(region, built_at=0)
+        session = MagicMock()
+
+        first = get_snapshot_index(session, "us-east-1", "111", ttl_seconds=60, clock=clock)
+        assert get_snapshot_index(session, "us-east-1", "111", ttl_seconds=60, clock=clock) is first
+        get_snapshot_index(session, "us-east-1", "222", ttl_seconds=60, clock=clock)
+        get_snapshot_index(session, "us-west-2", "111", ttl_seconds=60, clock=clock)
+        assert mock_build.call_count == 3
+
+        clock.return_value = 1061.0
+        rebuilt = get_snapshot_index(session, "us-east-1", "111", ttl_seconds=60, clock=clock)
+        assert rebuilt is not first
+        assert mock_build.call_count == 4
+
+
+@mock_aws
+def test_handler_annotates_when_requested() -> None:
+    """Test the handler adds snapshot annotations only when asked."""
+    ec2 = boto3.client("ec2", region_name="us-east-1")
+    vol = ec2.create_volume(Size=10, AvailabilityZone="us-east-1a")
+    ec2.create_snapshot(VolumeId=vol["VolumeId"])
+
+    event = {
+        "role_arn": "arn:aws:iam::123456789012:role/test",
+        "external_id": "test-external-id",
+        "regions": ["us-east-1"],
+    }
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        plain = handler(event, None)
+        annotated = handler({**event, "annotate_snapshots": True}, None)
+
+    assert "SafeToDelete" not in plain["items"][0]
+    assert annotated["meta"]["cached"] is False
+    item = annotated["items"][0]
+    assert item["SnapshotCount"] == 1
+    assert item["SafeToDelete"] is True
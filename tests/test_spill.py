@@ -0,0 +1,184 @@
+"""Tests for memory-bounded spill-to-disk buffering."""
+
+import json
+import random
+import tracemalloc
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from lambdas.scan_ec2_unattached_ebs.handler import handler
+from saverbot.sinks import FileSink, write_items
+from saverbot.spill import SpillBuffer
+
+
+def make_records(n: int) -> list[dict[str, Any]]:
+    """Build n records with shuffled keys."""
+    ids = list(range(n))
+    random.Random(42).shuffle(ids)
+    return [{"VolumeId": f"vol-{i:06d}", "Tags": {"n": str(i)}} for i in ids]
+
+
+def test_spill_buffer_without_budget_stays_in_memory(tmp_path: Path) -> None:
+    """Test that a zero budget never writes run files."""
+    records = make_records(500)
+
+    with SpillBuffer(0, key=lambda r: r["VolumeId"], directory=tmp_path) as buffer:
+        buffer.extend(records)
+        assert buffer.spilled_runs == 0
+        assert list(buffer) == sorted(records, key=lambda r: r["VolumeId"])
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_buffer_spills_and_merges_in_order(tmp_path: Path) -> None:
+    """Test that records come back sorted across many spilled runs."""
+    records = make_records(2000)
+
+    with SpillBuffer(16 * 1024, key=lambda r: r["VolumeId"], directory=tmp_path) as buffer:
+        buffer.extend(records)
+
+        assert buffer.count == 2000
+        assert buffer.spilled_runs > 5
+        assert list(buffer) == sorted(records, key=lambda r: r["VolumeId"])
+        # Iteration can be repeated
+        assert sum(1 for _ in buffer) == 2000
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_spill_buffer_keeps_insertion_order_for_equal_keys(tmp_path: Path) -> None:
+    """Test that the merge is stable for records with equal keys."""
+    records = [{"k": i % 3, "i": i} for i in range(300)]
+
+    with SpillBuffer(2048, key=lambda r: r["k"], directory=tmp_path) as buffer:
+        buffer.extend(records)
+        assert buffer.spilled_runs > 1
+        assert list(buffer) == sorted(records, key=lambda r: r["k"])
+
+
+def test_streaming_to_sink_keeps_peak_memory_near_budget(tmp_path: Path) -> None:
+    """Test spilling and streaming to a sink never holds all records at once."""
+    budget = 64 * 1024
+    ids = list(range(20000))
+    random.Random(1).shuffle(ids)
+
+    def record(i: int) -> dict[str, Any]:
+        return {"VolumeId": f"vol-{i:017x}", "Size": i % 500, "Tags": {"Name": f"v-{i}"}}
+
+    tracemalloc.start()
+    try:
+        with SpillBuffer(budget, key=lambda r: r["VolumeId"], directory=tmp_path) as buffer:
+            for i in ids:
+                buffer.add(record(i))
+            location, count = write_items(buffer, FileSink(tmp_path / "out"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert count == 20000
+    # Holding the records as dicts takes well over 10 MB
+    assert peak < budget + 128 * 1024
+    with open(location["path"], encoding="utf-8") as f:
+        written = [json.loads(line)["VolumeId"] for line in f]
+    assert written == sorted(record(i)["VolumeId"] for i in ids)
+
+
+def read_ndjson(path: str) -> list[dict[str, Any]]:
+    """Read an NDJSON file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def make_volumes(regions: list[str]) -> None:
+    """Create 20 unattached volumes in each region."""
+    for region in regions:
+        ec2 = boto3.client("ec2", region_name=region)
+        for size in range(1, 21):
+            ec2.create_volume(Size=size, AvailabilityZone=f"{region}a")
+
+
+EVENT: dict[str, Any] = {
+    "role_arn": "arn:aws:iam::123456789012:role/test",
+    "external_id": "test-external-id",
+    "regions": ["us-west-2", "us-east-1"],
+}
+
+
+@mock_aws
+def test_handler_streams_budgeted_results_to_file(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test a budgeted scan writes the same ordered items to a file, not the response."""
+    (tmp_path / "spill").mkdir()
+    make_volumes(EVENT["regions"])
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        inline = handler(EVENT, None)
+        saver_env(
+            memory_budget_bytes=1024,
+            spill_dir=tmp_path / "spill",
+            result_dir=tmp_path / "results",
+        )
+        first = handler(EVENT, None)
+        second = handler(EVENT, None)
+
+    assert "items" not in first
+    assert first["count"] == 40
+    assert first["meta"]["spilled_runs"] > 0
+    assert first["items_location"]["type"] == "file"
+    assert read_ndjson(first["items_location"]["path"]) == inline["items"]
+    regions = [item["Region"] for item in inline["items"]]
+    assert regions == ["us-west-2"] * 20 + ["us-east-1"] * 20
+    # Streamed results are not cached
+    assert second["meta"]["cached"] is False
+    assert second["items_location"] != first["items_location"]
+    assert list((tmp_path / "spill").iterdir()) == []
+
+
+def test_handler_refuses_file_sink_inside_lambda(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, saver_env: Callable[..., None]
+) -> None:
+    """Test a budgeted scan in Lambda needs the S3 sink rather than filling /tmp."""
+    saver_env(memory_budget_bytes=1024, spill_dir=tmp_path, result_dir=tmp_path / "results")
+    monkeypatch.setenv("AWS_LAMBDA_FUNCTION_NAME", "aws-saver-scan-ebs")
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        result = handler(EVENT, None)
+        mock_assume.assert_not_called()
+
+    assert result["error"]["code"] == "ResultSinkNotConfigured"
+    assert not (tmp_path / "results").exists()
+
+
+@mock_aws
+def test_handler_streams_budgeted_results_to_s3(
+    tmp_path: Path, saver_env: Callable[..., None]
+) -> None:
+    """Test the S3 sink uploads the items and leaves no staged file behind."""
+    saver_env(
+        memory_budget_bytes=1024,
+        spill_dir=tmp_path,
+        result_sink="s3",
+        result_bucket="results-bucket",
+    )
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket="results-bucket")
+    make_volumes(["us-east-1"])
+
+    with patch("lambdas.scan_ec2_unattached_ebs.handler.assume") as mock_assume:
+        mock_assume.return_value = boto3.Session()
+        result = handler({**EVENT, "regions": ["us-east-1"]}, None)
+
+    location = result["items_location"]
+    assert location["bucket"] == "results-bucket"
+    assert location["key"].startswith("scan-results/123456789012/")
+    body = s3.get_object(Bucket="results-bucket", Key=location["key"])["Body"].read()
+    assert len(body.decode("utf-8").splitlines()) == result["count"] == 20
+    assert list(tmp_path.iterdir()) == []